@@ -4,8 +4,12 @@
 
 import logging
 import os
+import shutil
+import tempfile
 import zipfile
 
+from typing import IO, List, NamedTuple, Optional, Union
+
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
@@ -22,9 +26,96 @@ def _unzip(file_path: str, dest_dir: str) -> None:
         raise ExtractionError(F'Failed to unzip Archive with error "{error}"')
 
 
+class ZipArchive():
+    """Zip archive read member by member without extracting it.
+
+    Nested archives are read into a spooled temporary file, which is kept
+    in memory up to the spill threshold and spilled to disk beyond it.
+    """
+
+    def __init__(self, source: Union[str, IO[bytes]],
+                 owned_file: Optional[IO[bytes]] = None) -> None:
+        """Open the archive from the file path or binary file object."""
+        self._owned_file = owned_file
+        try:
+            self._zip_ref = zipfile.ZipFile(source, 'r')
+        except (ValueError, zipfile.BadZipFile) as error:
+            if owned_file is not None:
+                owned_file.close()
+            raise ExtractionError(
+                F'Failed to open Archive with error "{error}"') from error
+
+    def member_names(self) -> List[str]:
+        """Get the names of the file members."""
+        return [info.filename for info in self._zip_ref.infolist()
+                if not info.is_dir()]
+
+    def member_size(self, name: str) -> int:
+        """Get the uncompressed size in bytes of the member."""
+        return self._zip_ref.getinfo(name).file_size
+
+    def member_crc32(self, name: str) -> int:
+        """Get the crc32 of the member recorded in the archive directory."""
+        return self._zip_ref.getinfo(name).CRC
+
+    def open_member(self, name: str) -> IO[bytes]:
+        """Open the member for reading."""
+        return self._zip_ref.open(name)
+
+    def open_nested(self, name: str, spill_threshold: int) -> 'ZipArchive':
+        """Open the member as archive."""
+        spool = tempfile.SpooledTemporaryFile(max_size=spill_threshold)
+        try:
+            with self.open_member(name) as member:
+                shutil.copyfileobj(member, spool)
+        except (ValueError, zipfile.BadZipFile) as error:
+            spool.close()
+            raise ExtractionError(
+                F'Failed to read nested Archive with error "{error}"'
+            ) from error
+        spool.seek(0)
+
+        return ZipArchive(spool, spool)
+
+    def close(self) -> None:
+        """Close the archive."""
+        self._zip_ref.close()
+        if self._owned_file is not None:
+            self._owned_file.close()
+
+    def __enter__(self) -> 'ZipArchive':
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+class ArchiveMember(NamedTuple):
+    """Member of an opened archive."""
+
+    archive: ZipArchive
+    name: str
+
+    def open(self) -> IO[bytes]:
+        """Open the member for reading."""
+        return self.archive.open_member(self.name)
+
+    def open_archive(self, spill_threshold: int) -> ZipArchive:
+        """Open the member as archive."""
+        return self.archive.open_nested(self.name, spill_threshold)
+
+    def size(self) -> int:
+        """Get the uncompressed size in bytes of the member."""
+        return self.archive.member_size(self.name)
+
+    def crc32(self) -> int:
+        """Get the crc32 of the member recorded in the archive directory."""
+        return self.archive.member_crc32(self.name)
+
+
 _ZIP_FILE_MAPPING = {
-    # Extension: (Zip, Unzip)
-    'zip': (None, _unzip)
+    # Extension: (Zip, Unzip, Open)
+    'zip': (None, _unzip, ZipArchive)
 }
 
 
@@ -49,6 +140,18 @@ def extract(file_path: str, dest_dir: str) -> None:
             raise NotImplementedError('Extract for "{ext}" not implemented')
 
 
+def open_archive(file_path: str) -> ZipArchive:
+    """Open the given file to read its members without extracting them."""
+    ext = file_path.split(os.extsep)[-1].lower()
+    try:
+        archive_tuple = _ZIP_FILE_MAPPING[ext]
+    except KeyError as exc:
+        raise ExtractionError(
+            F'Opening not supported for "{file_path}"') from exc
+    else:
+        return archive_tuple[2](file_path)
+
+
 def test() -> None:
     """Test function."""
 
@@ -2,25 +2,78 @@
 
 """Manage the Database."""
 
+import hashlib
 import logging
+import sqlite3
+import sys
+import time
 
 from contextlib import contextmanager
 
+from typing import (Dict, Iterator, List, NamedTuple, Optional, Sequence, Set,
+                    Tuple, Union, cast)
+
 import sqlalchemy
 
-from sqlalchemy import (Boolean, Column, Integer, String, ForeignKey, Table,
-                        UniqueConstraint, create_engine, Unicode)
+from sqlalchemy import (Boolean, Column, Float, Index, Integer, MetaData,
+                        String, ForeignKey, Table, create_engine, Unicode)
+
+from sqlalchemy.engine import Engine
 
 from sqlalchemy.ext.declarative import declarative_base
 
 from sqlalchemy.interfaces import PoolListener
 
-from sqlalchemy.orm import relationship, sessionmaker, mapper
+from sqlalchemy.orm import Session, relationship, sessionmaker
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from sqlalchemy.types import TypeEngine
 
 Base = declarative_base()  # pylint: disable=invalid-name
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+SALES_DATA_TABLE = 'SalesData'
+CONTENT_HASH_COLUMN = 'Content_Hash'
+
+# Backends inserting the SalesData rows on commit, as SQLAlchemy text
+# statement or straight through the sqlite3 executemany
+SQLALCHEMY_BACKEND = 'sqlalchemy'
+SQLITE3_BACKEND = 'sqlite3'
+INSERT_BACKENDS = [SQLALCHEMY_BACKEND, SQLITE3_BACKEND]
+
+# Value of a SalesData column and a row of values in column order
+RowValue = Optional[Union[str, int, float]]
+Row = Sequence[RowValue]
+
+# SQL types of the python types of SalesData columns, text by default
+_COLUMN_TYPE_MAPPING = {
+    int: Integer,
+    float: Float,
+}
+
+# Connection profile for large loads. With the write ahead log a crash
+# never corrupts the database, syncing only at checkpoints can lose the
+# last commits on a power failure but keeps each commit atomic. The
+# database stays in WAL mode afterwards, the mode is persistent.
+INGEST_PRAGMAS: Dict[str, str] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': '-262144',  # 256 MiB
+    'mmap_size': '268435456',  # 256 MiB
+    'temp_store': 'MEMORY',
+}
+
+# Connection profile for queries and small updates, the sqlite defaults.
+# The journal mode is left as it is, it is a property of the database file.
+SAFE_PRAGMAS: Dict[str, str] = {
+    'synchronous': 'FULL',
+    'cache_size': '-2000',
+    'mmap_size': '0',
+    'temp_store': 'DEFAULT',
+}
+
 
 class ScannedFile(Base):
     """Represent the already scanned files."""
@@ -28,22 +81,291 @@ class ScannedFile(Base):
     # pylint: disable=too-few-public-methods
 
     __tablename__ = 'scanned_file'
+    __table_args__ = (
+        Index('uix_scanned_file_size_checksum', 'size_bytes', 'checksum',
+              unique=True),
+    )
 
     # Use ID, keeps the foreign key size smalle
     id = Column(Integer, primary_key=True)  # pylint: disable=invalid-name
     full_path = Column(String)
     processed = Column(Boolean)
-    size_bytes = Column(String)
+    size_bytes = Column(Integer)
     checksum = Column(String)
 
     extracted_from_id = Column(Integer, ForeignKey('scanned_file.id'))
     extracted_from = relationship("ScannedFile", remote_side=[id])
 
-    UniqueConstraint('size_bytes', 'checksum', name='uix_1')
 
+class IngestCheckpoint(Base):
+    """Properties of a scanned file committed so far."""
+
+    # pylint: disable=too-few-public-methods
+
+    __tablename__ = 'ingest_checkpoint'
+
+    scanned_file_id = Column(
+        Integer, ForeignKey('scanned_file.id'), primary_key=True)
+    rows_committed = Column(Integer)
 
-class SalesData():  # pylint: disable=too-few-public-methods
-    """Sales Data DB."""
+
+class FileStat(Base):
+    """Cached fingerprint of a file, valid while the file stat matches."""
+
+    # pylint: disable=too-few-public-methods
+
+    __tablename__ = 'file_stat'
+
+    id = Column(Integer, primary_key=True)  # pylint: disable=invalid-name
+    full_path = Column(String, unique=True)
+    size_bytes = Column(Integer)
+    mtime_ns = Column(Integer)
+    inode = Column(Integer)
+    fingerprint = Column(String)
+    checksum = Column(String)
+
+
+class InsertCounts(NamedTuple):
+    """Number of SalesData rows inserted, updated and left unchanged."""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def combine(self, other: 'InsertCounts') -> 'InsertCounts':
+        """Add up the counts of two writes."""
+        return InsertCounts(*(count + other_count for count, other_count
+                              in zip(self, other)))
+
+
+class SalesDataStore():
+    """Writer of rows in SalesData column order into the sales table.
+
+    Every row is stored with a hash of its content, which covers all
+    columns but the natural key and the source columns telling which file
+    line the row was read from. With a natural key, rows already stored
+    are either ignored or, on upsert, updated if their content changed.
+    """
+
+    def __init__(self, table: Table, columns: Sequence[str],
+                 natural_key: Sequence[str] = (),
+                 source_columns: Sequence[str] = ()) -> None:
+        """Initialize the Sales Data Store."""
+        self.table = table
+        # Table with the columns and types of the rows, the same for flat
+        self.sales_table = table
+        self._columns = list(columns)
+        self._content_slots = [
+            idx for idx, col in enumerate(self._columns)
+            if col not in natural_key and col not in source_columns]
+        self._table_columns = self._columns + [CONTENT_HASH_COLUMN]
+        self._key_columns = list(natural_key)
+
+    @property
+    def columns(self) -> List[str]:
+        """Get the columns a row holds the values of, in order."""
+        return list(self._columns)
+
+    def column_types(self) -> Dict[str, type]:
+        """Get the python types of the columns of the rows."""
+        return {col: self.sales_table.c[col].type.python_type
+                for col in self._columns}
+
+    def content_hash(self, row: Row) -> int:
+        """Get the hash of the content columns as signed 64 bit integer."""
+        content = repr(tuple(row[slot] for slot in self._content_slots))
+        return int.from_bytes(
+            hashlib.blake2b(content.encode('utf8'), digest_size=8).digest(),
+            'big', signed=True)
+
+    def write_statement(self, upsert: bool,
+                        placeholders: Optional[Sequence[str]] = None) -> str:
+        """Get the statement writing a row of the table columns."""
+        if not (upsert and self._key_columns):
+            return insert_statement(self.table.name, self._table_columns,
+                                    placeholders)
+
+        key_list = ', '.join(F'"{col}"' for col in self._key_columns)
+        update_list = ', '.join(
+            F'"{col}" = excluded."{col}"' for col in self._table_columns
+            if col not in self._key_columns)
+        return (insert_statement(self.table.name, self._table_columns,
+                                 placeholders, 'INSERT') +
+                F' ON CONFLICT ({key_list}) DO UPDATE SET {update_list}'
+                F' WHERE "{self.table.name}"."{CONTENT_HASH_COLUMN}" IS NOT'
+                F' excluded."{CONTENT_HASH_COLUMN}"')
+
+    def insert_rows(self, session: Session, rows: Sequence[Row],
+                    backend: str = SQLALCHEMY_BACKEND,
+                    upsert: bool = False) -> InsertCounts:
+        """Write rows in SalesData column order, count what was changed."""
+        if not rows:
+            return InsertCounts()
+
+        hashes = [self.content_hash(row) for row in rows]
+        table_rows = [tuple(row) + (row_hash,) for row, row_hash in
+                      zip(self.to_table_rows(session, rows), hashes)]
+
+        # Rows are only ever added, so new rows have the higher ids
+        id_column = self.table.c.id
+        max_id = session.execute(
+            sqlalchemy.select([sqlalchemy.func.max(id_column)])).scalar()
+        if backend == SQLITE3_BACKEND:
+            changed = execute_many(session, self.write_statement(upsert),
+                                   table_rows)
+        else:
+            params = [F'p{idx}' for idx in range(len(self._table_columns))]
+            changed = int(session.execute(
+                sqlalchemy.text(self.write_statement(
+                    upsert, [F':{param}' for param in params])),
+                [dict(zip(params, row)) for row in table_rows]).rowcount)
+        inserted = session.execute(
+            sqlalchemy.select([sqlalchemy.func.count()]).where(
+                id_column > (max_id or 0))).scalar()
+
+        return InsertCounts(inserted, changed - inserted, len(rows) - changed)
+
+    def to_table_rows(self, session: Session,
+                      rows: Sequence[Row]) -> Sequence[Row]:
+        """Get the values of the table columns but the content hash."""
+        del session
+        return rows
+
+
+class Dimension(NamedTuple):
+    """Table of the distinct values of SalesData columns, used by id."""
+
+    name: str
+    columns: Sequence[str]
+    # Rows known upfront, added when the table is created
+    seed_rows: Sequence[Tuple[Optional[str], ...]] = ()
+
+
+class NormalizedSalesData(SalesDataStore):
+    """SalesData stored as fact table referencing dimension tables.
+
+    The fact table keeps the id of the dimension rows instead of repeating
+    their values, the SalesData view joins them back into the flat layout.
+    The dimension ids are loaded on the first insert and cached, new
+    dimension rows are added while inserting.
+    """
+
+    FACT_TABLE = 'sales_fact'
+
+    def __init__(self, sales_table: Table, dimensions: Sequence[Dimension],
+                 natural_key: Sequence[str] = (),
+                 source_columns: Sequence[str] = ()) -> None:
+        """Initialize the Normalized Sales Data."""
+        self._metadata = MetaData()
+        columns = row_columns(sales_table)
+        self._dimensions = dimensions
+        self._dimension_tables = {
+            dim.name: Table(
+                dim.name, self._metadata,
+                Column('id', Integer, primary_key=True),
+                *(Column(col, sales_table.c[col].type) for col in dim.columns))
+            for dim in dimensions}
+
+        dimension_columns = {col: F'{dim.name}_id'
+                             for dim in dimensions for col in dim.columns}
+        self._value_columns = [col for col in columns
+                               if col not in dimension_columns]
+        fact_table = Table(
+            self.FACT_TABLE, self._metadata,
+            Column('id', Integer, primary_key=True),
+            *(Column(F'{dim.name}_id', Integer, ForeignKey(F'{dim.name}.id'))
+              for dim in dimensions),
+            *(Column(col, sales_table.c[col].type)
+              for col in self._value_columns),
+            Column(CONTENT_HASH_COLUMN, Integer))
+
+        super().__init__(fact_table, columns, natural_key, source_columns)
+        self.sales_table = sales_table
+        self._table_columns = [col.name for col in fact_table.columns
+                               if col.name != 'id']
+        # Dimension values are unique by their id
+        self._key_columns = list(dict.fromkeys(
+            dimension_columns.get(col, col) for col in natural_key))
+        if self._key_columns:
+            Index(F'uix_{self.FACT_TABLE}_natural_key',
+                  *(fact_table.c[col] for col in self._key_columns),
+                  unique=True)
+
+        slots = {col: idx for idx, col in enumerate(columns)}
+        self._dimension_slots = [[slots[col] for col in dim.columns]
+                                 for dim in dimensions]
+        self._value_slots = [slots[col] for col in self._value_columns]
+        self._dimension_ids: Optional[
+            List[Dict[Tuple[RowValue, ...], int]]] = None
+
+    def create(self, engine: Engine) -> None:
+        """Create the missing tables, seed them and create the view."""
+        self._metadata.create_all(engine)
+        add_missing_columns(engine, self.table)
+        create_missing_indexes(engine, self.table)
+        if self._key_columns and not has_unique_index(engine, self.table):
+            self._key_columns = []
+        with engine.begin() as connection:
+            for dim in self._dimensions:
+                table = self._dimension_tables[dim.name]
+                if dim.seed_rows and connection.execute(
+                        sqlalchemy.select([sqlalchemy.func.count()])
+                        .select_from(table)).scalar() == 0:
+                    connection.execute(table.insert(), [
+                        dict(zip(dim.columns, row)) for row in dim.seed_rows])
+            connection.execute(self.view_statement())
+
+    def view_statement(self) -> str:
+        """Get the statement creating the flat SalesData view."""
+        sources = {col: self.FACT_TABLE for col in self._value_columns}
+        for dim in self._dimensions:
+            sources.update({col: dim.name for col in dim.columns})
+        select_list = ', '.join(
+            [F'"{self.FACT_TABLE}".id AS id'] +
+            [F'"{sources[col]}"."{col}" AS "{col}"' for col in self._columns])
+        joins = ' '.join(
+            F'LEFT JOIN "{dim.name}" ON "{dim.name}".id = '
+            F'"{self.FACT_TABLE}"."{dim.name}_id"'
+            for dim in self._dimensions)
+        return (F'CREATE VIEW IF NOT EXISTS "{SALES_DATA_TABLE}" AS '
+                F'SELECT {select_list} FROM "{self.FACT_TABLE}" {joins}')
+
+    def to_table_rows(self, session: Session,
+                      rows: Sequence[Row]) -> List[Row]:
+        """Replace the dimension values of the rows by their ids."""
+        if self._dimension_ids is None:
+            self._dimension_ids = [
+                self._load_dimension_ids(session, dim)
+                for dim in self._dimensions]
+
+        fact_rows: List[Row] = []
+        dimensions = list(zip(self._dimensions, self._dimension_slots,
+                              self._dimension_ids))
+        for row in rows:
+            fact_row: List[RowValue] = []
+            for dim, slots, ids in dimensions:
+                key = tuple(row[slot] for slot in slots)
+                dimension_id = ids.get(key)
+                if dimension_id is None and key.count(None) != len(key):
+                    dimension_id = self._add_dimension_row(session, dim, key)
+                    ids[key] = dimension_id
+                fact_row.append(dimension_id)
+            fact_row.extend(row[slot] for slot in self._value_slots)
+            fact_rows.append(tuple(fact_row))
+        return fact_rows
+
+    def _load_dimension_ids(self, session: Session, dim: Dimension
+                            ) -> Dict[Tuple[RowValue, ...], int]:
+        table = self._dimension_tables[dim.name]
+        return {tuple(row[1:]): row[0] for row in session.execute(
+            sqlalchemy.select(
+                [table.c.id] + [table.c[col] for col in dim.columns]))}
+
+    def _add_dimension_row(self, session: Session, dim: Dimension,
+                           key: Tuple[RowValue, ...]) -> int:
+        result = session.execute(self._dimension_tables[dim.name].insert(),
+                                 dict(zip(dim.columns, key)))
+        return int(result.inserted_primary_key[0])
 
 
 class SqliteForeignKeysListener(PoolListener):
@@ -54,6 +376,19 @@ class SqliteForeignKeysListener(PoolListener):
         dbapi_con.execute('pragma foreign_keys=ON')
 
 
+class SqlitePragmaListener(PoolListener):
+    """Class to apply the pragmas of the connection profile."""
+
+    def __init__(self, pragmas: Dict[str, str]) -> None:
+        """Initialize the Pragma Listener."""
+        self.pragmas = pragmas
+
+    def connect(self, dbapi_con: sqlite3.Connection,
+                con_record: object) -> None:
+        """Apply the pragmas to the new connection."""
+        apply_pragmas(dbapi_con, self.pragmas)
+
+
 class SqliteDb():
     """SQLAlchemy Sqlite database connection."""
 
@@ -62,12 +397,17 @@ class SqliteDb():
         self.connection_string = 'sqlite:///' + db_path
         self._session_func = None
         self._engine = None
+        self._pragma_listener = SqlitePragmaListener(SAFE_PRAGMAS)
+        self.sales_data: Optional[SalesDataStore] = None
 
     def __enter__(self):
+        # Sqlite file databases don't pool connections, so the pragmas of
+        # the current profile are applied to every new session
         self._engine = create_engine(
             self.connection_string,
             # echo=True,
-            listeners=[SqliteForeignKeysListener()])  # Enforce Foreign Keys
+            listeners=[SqliteForeignKeysListener(),  # Enforce Foreign Keys
+                       self._pragma_listener])
 
         self._session_func = sessionmaker(bind=self._engine)
         return self
@@ -75,15 +415,97 @@ class SqliteDb():
     def __exit__(self, exc_type, exc_val, exc_tb):
         pass
 
-    def create(self, sales_data_columns):
-        """Create this SQL Database."""
+    def create(self, sales_data_columns: Sequence[str],
+               column_types: Optional[Dict[str, type]] = None,
+               dimensions: Sequence[Dimension] = (), normalize: bool = False,
+               natural_key: Sequence[str] = (),
+               source_columns: Sequence[str] = ()) -> None:
+        """Create this SQL Database.
+
+        Column types map SalesData columns to the python type stored,
+        columns without a type are text. An existing SalesData table keeps
+        the types it was created with.
+
+        A new database is normalized into the dimensions if requested, an
+        existing database keeps the layout it was created with. A unique
+        index on the natural key columns keeps sales stored only once, the
+        source columns are left out of the content hash of the rows.
+        """
+        inspector = sqlalchemy.inspect(self._engine)
+        if SALES_DATA_TABLE in inspector.get_view_names():
+            normalize = True
+        elif SALES_DATA_TABLE in inspector.get_table_names():
+            normalize = False
+
+        # SalesData is built for each database, types of an existing table
+        # are kept
+        types = {
+            col: _COLUMN_TYPE_MAPPING.get(col_type, Unicode(255))
+            for col, col_type in (column_types or {}).items()}
+        types.update(self.existing_column_types(SALES_DATA_TABLE))
         sales_table = Table(
-            'SalesData', Base.metadata,
+            SALES_DATA_TABLE, MetaData(),
             Column('id', Integer, primary_key=True),
-            *(Column(col, Unicode(255)) for col in sales_data_columns))
-        mapper(SalesData, sales_table)
+            *(Column(col, types.get(col, Unicode(255)))
+              for col in sales_data_columns),
+            Column(CONTENT_HASH_COLUMN, Integer))
+        if natural_key:
+            Index('uix_sales_data_natural_key',
+                  *(sales_table.c[col] for col in natural_key),
+                  unique=True)
 
         Base.metadata.create_all(self._engine)
+        if normalize:
+            logger.info('Storing SalesData normalized')
+            # SalesData is the view joining the normalized tables
+            normalized_sales_data = NormalizedSalesData(
+                sales_table, dimensions, natural_key, source_columns)
+            normalized_sales_data.create(self._engine)
+            self.sales_data = normalized_sales_data
+        else:
+            sales_table.create(self._engine, checkfirst=True)
+            add_missing_columns(self._engine, sales_table)
+            create_missing_indexes(self._engine, sales_table)
+            self.sales_data = SalesDataStore(
+                sales_table, row_columns(sales_table),
+                natural_key if natural_key and has_unique_index(
+                    self._engine, sales_table) else (),
+                source_columns)
+        create_missing_indexes(self._engine, ScannedFile.__table__)
+
+    def existing_column_types(self,
+                              table_name: str) -> Dict[str, TypeEngine]:
+        """Get the SQL types of the columns of a table or view."""
+        inspector = sqlalchemy.inspect(self._engine)
+        if table_name not in (inspector.get_table_names() +
+                              inspector.get_view_names()):
+            return {}
+        return {col['name']: col['type']
+                for col in inspector.get_columns(table_name)}
+
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """Use the ingest profile for the sessions of a large load.
+
+        Afterwards the query planner statistics are updated and the safe
+        profile is used again.
+        """
+        logger.info('Bulk Load Started')
+        self._pragma_listener.pragmas = INGEST_PRAGMAS
+        try:
+            yield
+        finally:
+            self._pragma_listener.pragmas = SAFE_PRAGMAS
+            self.optimize()
+            logger.info('Bulk Load Finished')
+
+    def optimize(self) -> None:
+        """Update the statistics used by the query planner."""
+        if self._engine is None:
+            raise ValueError('The database has to be opened first')
+        with self._engine.connect() as connection:
+            connection.execute('ANALYZE')
+            connection.execute('PRAGMA optimize')
 
     @contextmanager
     def session_scope(self):
@@ -99,18 +521,147 @@ class SqliteDb():
             session.close()
 
 
+def apply_pragmas(dbapi_con: sqlite3.Connection,
+                  pragmas: Dict[str, str]) -> None:
+    """Apply the pragmas to a sqlite3 connection."""
+    for name, value in pragmas.items():
+        dbapi_con.execute(F'pragma {name}={value}')
+
+
+def has_unique_index(engine: Engine, table: Table) -> bool:
+    """Check a unique index of the table in the model exists.
+
+    Creating it fails on a database already holding duplicate rows, such
+    a database has to be written without natural key.
+    """
+    existing = {index['name'] for index in
+                sqlalchemy.inspect(engine).get_indexes(table.name)}
+    if any(index.unique and index.name in existing
+           for index in table.indexes):
+        return True
+    logger.warning(F'No unique index on "{table.name}", rows already '
+                   F'stored are not detected')
+    return False
+
+
+def add_missing_columns(engine: Engine, table: Table) -> None:
+    """Add the columns missing on a table created by an older version."""
+    existing = {col['name'] for col in
+                sqlalchemy.inspect(engine).get_columns(table.name)}
+    for col in table.columns:
+        if col.name not in existing:
+            logger.info(F'Adding Column "{col.name}" to "{table.name}"')
+            engine.execute(
+                F'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" '
+                F'{col.type.compile(dialect=engine.dialect)}')
+
+
+def create_missing_indexes(engine: Engine, table: Table) -> None:
+    """Create the indexes missing on a table created by an older version."""
+    existing = {index['name'] for index in
+                sqlalchemy.inspect(engine).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing:
+            logger.info(F'Creating Index "{index.name}"')
+            try:
+                index.create(engine)
+            except sqlalchemy.exc.IntegrityError as error:
+                logger.error(F'Failed to create Index "{index.name}": '
+                             F'{error}')
+
+
+def estimate_row_bytes(row: Union[Row, Dict[str, RowValue]]) -> int:
+    """Estimate the memory of a buffered row or dictionary.
+
+    Values shared with other rows, like pooled strings, are counted for
+    every row, so the estimate is an upper bound.
+    """
+    values = row.values() if isinstance(row, dict) else row
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in values
+                                    if value is not None)
+
+
+class CommitPolicy():
+    """Decide when the DataManager commits the buffered properties.
+
+    A commit is due once commit_max rows or memory_budget bytes are buffered.
+    With target seconds the row limit is adapted after every commit to the
+    insert rate measured, so commits take about the target time, commit_max
+    stays the upper bound. A budget or target of 0 disables it.
+    """
+
+    MIN_COMMIT_ROWS = 1000
+
+    def __init__(self, commit_max: int, memory_budget: int = 0,
+                 target_seconds: float = 0) -> None:
+        """Initialize the Commit Policy."""
+        self.commit_max = commit_max
+        self.commit_rows = commit_max
+        self.memory_budget = memory_budget
+        self.target_seconds = target_seconds
+
+    def commit_due(self, rows: int, buffered_bytes: int) -> bool:
+        """Check if the buffered properties should be committed."""
+        return rows >= self.commit_rows or (
+            self.memory_budget > 0 and buffered_bytes >= self.memory_budget)
+
+    def committed(self, rows: int, buffered_bytes: int,
+                  seconds: float) -> None:
+        """Log the timing of a commit and adapt the row limit to it."""
+        rate = rows / seconds if seconds > 0 else float(rows)
+        logger.info(F'Committed {rows} Properties, ~{buffered_bytes} Bytes '
+                    F'in {seconds:.2f}s, {rate:.0f} Properties/s')
+        if self.target_seconds > 0:
+            # Averaged with the current limit to damp outliers
+            self.commit_rows = max(self.MIN_COMMIT_ROWS, min(
+                self.commit_max,
+                (self.commit_rows + int(rate * self.target_seconds)) // 2))
+            logger.info(F'Commit Size: {self.commit_rows} Properties')
+
+
 class DataManager():
     """Manager for combined commits."""
 
-    def __init__(self, session, commit_max=10000):
-        """Initialize Datamanager."""
+    def __init__(self, session: Session, commit_max: int = 10000,
+                 backend: str = SQLALCHEMY_BACKEND,
+                 sales_data: Optional['SalesDataStore'] = None,
+                 upsert: bool = False,
+                 commit_policy: Optional[CommitPolicy] = None) -> None:
+        """Initialize Datamanager.
+
+        Properties can only be added with a sales data store, scanned
+        files without. Without commit policy the properties are committed
+        every commit_max properties.
+        """
         logger.info('DataManager.__init__()')
-        self._commit_max = commit_max
+        if backend not in INSERT_BACKENDS:
+            raise ValueError(F'Unknown insert backend "{backend}"')
+
+        self._commit_policy = commit_policy or CommitPolicy(commit_max)
+        self._backend = backend
+        self._sales_data = sales_data
+        self._upsert = upsert
         self._property_count = 0
-        self._property_list = []
+        self._buffered_bytes = 0
+        self._property_rows: List[Row] = []
         self._session = session
         self._commit_count = 0
         self._property_total = 0
+        self.counts = InsertCounts()
+
+        # (size, checksum) of all scanned files, if preloaded
+        self._scanned_keys: Optional[Set[Tuple[int, str]]] = None
+
+        # Scanned files and processed flags written with the next commit
+        self._next_scanned_id: Optional[int] = None
+        self._new_scanned_files: List[ScannedFile] = []
+        self._new_scanned_keys: Dict[Tuple[int, str], ScannedFile] = {}
+        self._processed_ids: Set[int] = set()
+
+        # Properties added per scanned file since the last commit and the
+        # checkpoints of unfinished files of an earlier run, once loaded
+        self._file_rows: Dict[int, int] = {}
+        self._checkpoints: Optional[Dict[int, int]] = None
 
     def __enter__(self):
         logger.info('DataManager.__enter__()')
@@ -119,43 +670,220 @@ class DataManager():
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.commit()
         logger.debug(F'Added Properties: {self._property_total}')
+        logger.info(F'Properties Inserted: {self.counts.inserted}, '
+                    F'Updated: {self.counts.updated}, '
+                    F'Unchanged: {self.counts.unchanged}')
         logger.debug(F'Commits: {self._commit_count}')
 
     def add_scanned_file(self, scanned_file: ScannedFile) -> None:
-        """Add a scanned file entry."""
-        self._session.add(scanned_file)
-        self._session.flush()
-
-    def find_scanned_file(self, size: int,
-                          checksum: int) -> sqlalchemy.orm.query.Query:
+        """Add a scanned file entry.
+
+        The id is assigned in memory, the entry is inserted with the next
+        commit together with all others added since.
+        """
+        if self._next_scanned_id is None:
+            self._next_scanned_id = (self._session.query(
+                sqlalchemy.func.max(ScannedFile.id)).scalar() or 0) + 1
+        scanned_file.id = self._next_scanned_id
+        self._next_scanned_id += 1
+
+        key = (scanned_file.size_bytes, scanned_file.checksum)
+        self._new_scanned_files.append(scanned_file)
+        self._new_scanned_keys[key] = scanned_file
+        if self._scanned_keys is not None:
+            self._scanned_keys.add(key)
+
+    def set_processed(self, scanned_file: ScannedFile) -> None:
+        """Flag the scanned file as processed with the next commit."""
+        # Not tracked by the session, the flags are updated in one statement
+        set_committed_value(scanned_file, 'processed', True)
+        self._processed_ids.add(scanned_file.id)
+
+    def write_scanned_files(self) -> None:
+        """Write the added scanned files and processed flags, uncommitted."""
+        table = ScannedFile.__table__
+        if self._new_scanned_files:
+            self._session.execute(table.insert(), [
+                {column.key: getattr(scanned_file, column.key)
+                 for column in table.columns}
+                for scanned_file in self._new_scanned_files])
+            logger.debug(F'Scanned Files Added: '
+                         F'{len(self._new_scanned_files)}')
+            del self._new_scanned_files[:]
+            self._new_scanned_keys.clear()
+
+        if self._processed_ids:
+            self._session.execute(
+                table.update().where(
+                    table.c.id == sqlalchemy.bindparam('file_id')).values(
+                        processed=True),
+                [{'file_id': file_id}
+                 for file_id in sorted(self._processed_ids)])
+            self._processed_ids.clear()
+
+    def find_checkpoint(self, file_id: int) -> int:
+        """Get the Properties of the file committed by an earlier run."""
+        if self._checkpoints is None:
+            query = self._session.query(
+                IngestCheckpoint.scanned_file_id,
+                IngestCheckpoint.rows_committed).join(
+                    ScannedFile,
+                    ScannedFile.id == IngestCheckpoint.scanned_file_id)
+            self._checkpoints = {
+                int(file_id): int(rows) for file_id, rows in
+                query.filter(ScannedFile.processed.isnot(True))}
+            logger.info(F'Loaded {len(self._checkpoints)} Checkpoints of '
+                        F'unfinished Scanned Files')
+        return self._checkpoints.get(file_id, 0)
+
+    def _write_checkpoints(self) -> None:
+        # Only written on commit, together with the rows counted
+        if self._file_rows:
+            self._session.execute(sqlalchemy.text(
+                F'INSERT INTO {IngestCheckpoint.__tablename__} '
+                F'(scanned_file_id, rows_committed) '
+                F'VALUES (:file_id, :rows) '
+                F'ON CONFLICT(scanned_file_id) DO UPDATE SET '
+                F'rows_committed = rows_committed + excluded.rows_committed'
+            ), [{'file_id': file_id, 'rows': rows}
+                for file_id, rows in sorted(self._file_rows.items())])
+            self._file_rows.clear()
+
+    def get_scanned_files(self) -> List[ScannedFile]:
+        """Get all scanned files."""
+        self.write_scanned_files()
+        return list(self._session.query(ScannedFile))
+
+    def find_last_scanned_file(self) -> Optional[ScannedFile]:
+        """Find the most recently scanned file."""
+        self.write_scanned_files()
+        return self._session.query(ScannedFile).order_by(
+            ScannedFile.id.desc()).first()
+
+    def preload_scanned_files(self) -> None:
+        """Load the keys of all scanned files.
+
+        Afterwards only files with a known key are looked up in the DB,
+        new files are told apart in memory.
+        """
+        self._scanned_keys = {
+            (int(size), str(checksum)) for size, checksum in
+            self._session.query(ScannedFile.size_bytes, ScannedFile.checksum)}
+        self._scanned_keys.update(self._new_scanned_keys)
+        logger.info(F'Preloaded {len(self._scanned_keys)} Scanned Files')
+
+    def find_scanned_file(
+            self, size: int,
+            checksum: str) -> Optional[ScannedFile]:
         """Find a scanned file."""
+        if ((self._scanned_keys is not None) and
+                ((size, checksum) not in self._scanned_keys)):
+            return None
+        if (size, checksum) in self._new_scanned_keys:
+            return self._new_scanned_keys[(size, checksum)]
         return self._session.query(ScannedFile).filter_by(
             size_bytes=size, checksum=checksum).first()
 
-    def add_property_list(self, property_list) -> None:
-        """Add a list of properties to Datamanager."""
-        count = len(property_list)
-        self._property_list += property_list
+    def load_file_stats(self) -> Dict[str, FileStat]:
+        """Load the cached file stats by path."""
+        return {file_stat.full_path: file_stat
+                for file_stat in self._session.query(FileStat)}
+
+    def add_file_stat(self, file_stat: FileStat) -> None:
+        """Add a cached file stat."""
+        self._session.add(file_stat)
+
+    def add_property_rows(self, property_rows: Sequence[Row],
+                          file_id: Optional[int] = None) -> None:
+        """Add a list of property rows in SalesData column order.
+
+        The rows of a scanned file are counted in its checkpoint on commit.
+        """
+        if self._sales_data is None:
+            raise ValueError('No SalesData store to add properties to')
+        self._property_rows += property_rows
+        if file_id is not None:
+            self._file_rows[file_id] = (
+                self._file_rows.get(file_id, 0) + len(property_rows))
+        self._buffered(property_rows)
+
+    def _buffered(self, properties: Sequence[Row]) -> None:
+        count = len(properties)
         self._property_count += count
         self._property_total += count
+        # The first property is taken as sample for the whole list
+        if properties:
+            self._buffered_bytes += estimate_row_bytes(properties[0]) * count
 
-        if self._property_count >= self._commit_max:
+        if self._commit_policy.commit_due(self._property_count,
+                                          self._buffered_bytes):
             self.commit()
 
-    def commit(self):
+    def commit(self) -> None:
         """Commit the data of Datamanager."""
         logger.info('DataManager.commit()')
         if self._property_count > 0:
             logger.info(F'Property Count: {self._property_count}')
-            insert_bulk_sales_data(self._session, self._property_list)
+            start = time.perf_counter()
+            # Properties are only added with a SalesData store
+            sales_data = cast(SalesDataStore, self._sales_data)
+            counts = sales_data.insert_rows(
+                self._session, self._property_rows, self._backend,
+                self._upsert)
+            # Processed flags and checkpoints go with the rows of the files
+            self.write_scanned_files()
+            self._write_checkpoints()
             self._session.commit()
+            self._commit_policy.committed(
+                self._property_count, self._buffered_bytes,
+                time.perf_counter() - start)
+            self.counts = self.counts.combine(counts)
+            logger.info(F'Inserted: {counts.inserted}, '
+                        F'Updated: {counts.updated}, '
+                        F'Unchanged: {counts.unchanged}')
             self._property_count = 0
+            self._buffered_bytes = 0
             self._commit_count += 1
-            del self._property_list[:]
+            del self._property_rows[:]
             logger.info((F'Properties Added: {self._property_total:20}'
                          F', Commits: {self._commit_count:10}'))
+        elif self._new_scanned_files or self._processed_ids:
+            self.write_scanned_files()
+            self._session.commit()
 
 
-def insert_bulk_sales_data(session, data_dic):
-    """Insert bulk data into this session."""
-    session.bulk_insert_mappings(SalesData, data_dic)
+def row_columns(sales_table: Table) -> List[str]:
+    """Get the columns of a sales table a row holds the values of."""
+    return [col.name for col in sales_table.columns
+            if col.name not in ('id', CONTENT_HASH_COLUMN)]
+
+
+def insert_statement(table_name: str, columns: Sequence[str],
+                     placeholders: Optional[Sequence[str]] = None,
+                     verb: str = 'INSERT OR IGNORE') -> str:
+    """Get the prepared INSERT statement for rows of the given columns.
+
+    Rows violating a unique index are ignored by default, placeholders
+    default to the positional sqlite3 ones.
+    """
+    column_list = ', '.join(F'"{col}"' for col in columns)
+    value_list = ', '.join(placeholders or ['?'] * len(columns))
+    return (F'{verb} INTO "{table_name}" ({column_list}) '
+            F'VALUES ({value_list})')
+
+
+def execute_many(session: Session, statement: str,
+                 rows: Sequence[Row]) -> int:
+    """Execute a statement through the raw sqlite3 connection.
+
+    The rows are written on the connection of the session, so they are
+    committed or rolled back together with the session. The number of
+    rows changed is returned.
+    """
+    dbapi_connection = session.connection().connection
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.executemany(statement, rows)
+        return int(cursor.rowcount)
+    finally:
+        cursor.close()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+"""Module to fingerprint files by size and checksum."""
+
+import concurrent.futures
+import hashlib
+import logging
+import os
+import zlib
+
+from typing import IO, Dict, Iterable, Optional, Tuple, Type
+
+import archive_mgr
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Large reads keep the time spent outside of the GIL releasing hash calls low
+READ_BUFFER_SIZE = 1024 * 1024
+
+ADLER32 = 'adler32'
+CRC32 = 'crc32'
+BLAKE2B = 'blake2b'
+
+# Size and checksum of a file
+Fingerprint = Tuple[int, str]
+
+
+class FingerprintEngine():
+    """Checksum calculation of a fingerprint engine.
+
+    Checksums are prefixed with the engine name so checksums of different
+    engines never match, only the legacy adler32 checksums are bare numbers.
+    """
+
+    NAME = ''
+
+    def update(self, data: bytes) -> None:
+        """Add the data to the checksum."""
+        raise NotImplementedError
+
+    def checksum(self) -> str:
+        """Get the checksum of the data added."""
+        raise NotImplementedError
+
+    @classmethod
+    def member_checksum(cls, member: archive_mgr.ArchiveMember) -> str:
+        """Get the checksum of the archive member."""
+        engine = cls()
+        with member.open() as member_file:
+            update_from_stream(engine, member_file)
+        return engine.checksum()
+
+
+class Adler32Engine(FingerprintEngine):
+    """Adler32 checksum, stored as bare number for existing databases."""
+
+    NAME = ADLER32
+
+    def __init__(self) -> None:
+        """Initialize the Adler32 Engine."""
+        self._csum = 1
+
+    def update(self, data: bytes) -> None:
+        """Add the data to the checksum."""
+        self._csum = zlib.adler32(data, self._csum)
+
+    def checksum(self) -> str:
+        """Get the checksum of the data added."""
+        return str(self._csum & 0xffffffff)
+
+
+class Crc32Engine(FingerprintEngine):
+    """Crc32 checksum, read from the archive directory for members."""
+
+    NAME = CRC32
+
+    def __init__(self) -> None:
+        """Initialize the Crc32 Engine."""
+        self._crc = 0
+
+    def update(self, data: bytes) -> None:
+        """Add the data to the checksum."""
+        self._crc = zlib.crc32(data, self._crc)
+
+    def checksum(self) -> str:
+        """Get the checksum of the data added."""
+        return format_crc32(self._crc)
+
+    @classmethod
+    def member_checksum(cls, member: archive_mgr.ArchiveMember) -> str:
+        """Get the checksum without decompressing the member."""
+        return format_crc32(member.crc32())
+
+
+class Blake2bEngine(FingerprintEngine):
+    """Blake2b hash, not prone to accidental collisions like the crcs."""
+
+    NAME = BLAKE2B
+
+    def __init__(self) -> None:
+        """Initialize the Blake2b Engine."""
+        self._hash = hashlib.blake2b(digest_size=32)
+
+    def update(self, data: bytes) -> None:
+        """Add the data to the checksum."""
+        self._hash.update(data)
+
+    def checksum(self) -> str:
+        """Get the checksum of the data added."""
+        return F'{BLAKE2B}:{self._hash.hexdigest()}'
+
+
+_ENGINE_MAPPING: Dict[str, Type[FingerprintEngine]] = {
+    engine.NAME: engine
+    for engine in (Adler32Engine, Crc32Engine, Blake2bEngine)}
+
+ENGINE_NAMES = list(_ENGINE_MAPPING)
+
+
+def format_crc32(crc: int) -> str:
+    """Format a crc32 checksum."""
+    return F'{CRC32}:{crc & 0xffffffff:08x}'
+
+
+def get_engine(name: str) -> Type[FingerprintEngine]:
+    """Get the fingerprint engine by name."""
+    try:
+        return _ENGINE_MAPPING[name]
+    except KeyError as exc:
+        raise ValueError(F'Unknown fingerprint engine "{name}"') from exc
+
+
+def engine_of_checksum(checksum: str) -> str:
+    """Get the name of the engine a stored checksum was calculated with."""
+    prefix, separator, _ = checksum.partition(':')
+    if separator and prefix in _ENGINE_MAPPING:
+        return prefix
+    return ADLER32
+
+
+def update_from_stream(engine: FingerprintEngine,
+                       file_handle: IO[bytes]) -> None:
+    """Add the data of the binary stream to the checksum."""
+    for chunk in iter(lambda: file_handle.read(READ_BUFFER_SIZE), b''):
+        engine.update(chunk)
+
+
+def checksum_stream(file_handle: IO[bytes], engine_name: str) -> str:
+    """Calculate the checksum of the binary stream."""
+    engine = get_engine(engine_name)()
+    update_from_stream(engine, file_handle)
+    return engine.checksum()
+
+
+def fingerprint_file(file_path: str, engine_name: str) -> Fingerprint:
+    """Get the size and checksum of the given file."""
+    with open(file_path, 'rb') as file_handle:
+        checksum = checksum_stream(file_handle, engine_name)
+    return os.path.getsize(file_path), checksum
+
+
+def fingerprint_member(member: archive_mgr.ArchiveMember,
+                       engine_name: str) -> Fingerprint:
+    """Get the size and checksum of the given archive member."""
+    return member.size(), get_engine(engine_name).member_checksum(member)
+
+
+def rehash_stream(file_handle: IO[bytes], old_checksum: str,
+                  engine_name: str) -> Optional[str]:
+    """Calculate the checksum of the binary stream with another engine.
+
+    The old checksum is verified in the same pass, None is returned if the
+    stream doesn't match it anymore.
+    """
+    old_engine = get_engine(engine_of_checksum(old_checksum))()
+    new_engine = get_engine(engine_name)()
+    for chunk in iter(lambda: file_handle.read(READ_BUFFER_SIZE), b''):
+        old_engine.update(chunk)
+        new_engine.update(chunk)
+
+    if old_engine.checksum() != old_checksum:
+        return None
+    return new_engine.checksum()
+
+
+def rehash_file(file_path: str, old_checksum: str,
+                engine_name: str) -> Optional[str]:
+    """Calculate the checksum of the file with another engine."""
+    with open(file_path, 'rb') as file_handle:
+        return rehash_stream(file_handle, old_checksum, engine_name)
+
+
+def rehash_files(old_checksums: Iterable[Tuple[str, str]], engine_name: str,
+                 threads: int) -> Dict[Tuple[str, str], Optional[str]]:
+    """Calculate the checksums of many files with another engine.
+
+    The files are given as pairs of path and old checksum, a path can be
+    listed with several old checksums and each is verified on its own. The
+    hash functions release the GIL on large buffers, so the files are hashed
+    in parallel. Files that can't be read are mapped to None.
+    """
+    checksums: Dict[Tuple[str, str], Optional[str]] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = {
+            pool.submit(rehash_file, file_path, old_checksum, engine_name):
+            (file_path, old_checksum)
+            for file_path, old_checksum in set(old_checksums)}
+        for future in concurrent.futures.as_completed(futures):
+            file_path, old_checksum = futures[future]
+            try:
+                checksums[(file_path, old_checksum)] = future.result()
+            except OSError as error:
+                logger.error(F'Failed to rehash "{file_path}": {error}')
+                checksums[(file_path, old_checksum)] = None
+
+    return checksums
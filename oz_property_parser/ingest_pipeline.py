@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""Stages of worker threads connected by queues."""
+
+import logging
+import queue
+import threading
+
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+ItemT = TypeVar('ItemT')
+
+
+class StageControl():
+    """Control of a stage independent of the items it handles."""
+
+    name: str
+    maxsize: int
+    max_depth: int
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Stop the worker threads once the queued items are handled."""
+        raise NotImplementedError
+
+    def depth(self) -> int:
+        """Get the number of queued items."""
+        raise NotImplementedError
+
+
+class Stage(StageControl, Generic[ItemT]):
+    """Pipeline stage, worker threads handling the items of a queue.
+
+    A maxsize of 0 makes the queue unbounded. A bounded queue blocks the
+    producers while the stage is behind, which is what keeps memory bounded.
+    Errors raised by the handler are passed to the error handler so the
+    consumer of the stage can react to them, the worker keeps running.
+    """
+
+    def __init__(self, name: str, handler: Callable[[ItemT], None],
+                 error_handler: Callable[[ItemT, Exception], None],
+                 workers: int = 1, maxsize: int = 0) -> None:
+        """Initialize the Stage."""
+        if workers < 1:
+            raise ValueError(F'Stage "{name}" needs at least 1 worker')
+
+        self.name = name
+        self.maxsize = maxsize
+        self.max_depth = 0
+        self._handler = handler
+        self._error_handler = error_handler
+        # None is put once per worker to stop the stage
+        self._queue: 'queue.Queue[Optional[ItemT]]' = queue.Queue(maxsize)
+        self._threads = [
+            threading.Thread(target=self._run, name=F'{name}-{idx}',
+                             daemon=True)
+            for idx in range(workers)]
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, item: ItemT) -> None:
+        """Queue an item, blocks while a bounded queue is full."""
+        self._queue.put(item)
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def stop(self) -> None:
+        """Stop the worker threads once the queued items are handled."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def depth(self) -> int:
+        """Get the number of queued items."""
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            try:
+                self._handler(item)
+            except Exception as error:  # pylint: disable=broad-except
+                logger.exception(F'Stage "{self.name}" failed: {error}')
+                self._error_handler(item, error)
+
+
+def format_depths(depths: Dict[str, int],
+                  maxsizes: Dict[str, int]) -> str:
+    """Format queue depths as "name depth/maxsize", unbounded without max."""
+    return ', '.join(
+        F'{name} {depth}/{maxsizes[name]}' if maxsizes.get(name)
+        else F'{name} {depth}'
+        for name, depth in depths.items())
+
+
+class QueueMonitor():
+    """Log the queue depths of stages at a fixed interval."""
+
+    def __init__(self, depth_sources: Dict[str, Callable[[], int]],
+                 maxsizes: Dict[str, int], interval: float) -> None:
+        """Initialize the Queue Monitor."""
+        self._depth_sources = depth_sources
+        self._maxsizes = maxsizes
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def depths(self) -> Dict[str, int]:
+        """Get the current depth of each queue."""
+        return {name: depth_source()
+                for name, depth_source in self._depth_sources.items()}
+
+    def start(self) -> None:
+        """Start logging, an interval of 0 or less disables the logging."""
+        if self._interval > 0:
+            self._thread = threading.Thread(
+                target=self._run, name='queue-monitor', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop logging."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            logger.info(F'Queue Depths: '
+                        F'{format_depths(self.depths(), self._maxsizes)}')
@@ -3,28 +3,130 @@
 """Main program to run the property data extractor."""
 
 import argparse
-import csv
+import collections
+import concurrent.futures
+import functools
+import io
 import logging
+import multiprocessing
 import os
+import queue
 import shutil
-import zlib
+import threading
 
-from typing import List
+from typing import (IO, Callable, Deque, Dict, FrozenSet, Iterable, Iterator,
+                    List, NamedTuple, Optional, Tuple, Type, Union, cast)
 
 import archive_mgr
 import db_store
+import fingerprint
+import ingest_pipeline
+import property_definitions_nsw as nsw_def
 import property_file_manager as prop_mgr
 import property_parser
 import project_logger
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Number of properties handed to the DataManager at a time
+PARSE_BATCH_SIZE = 10000
+
+# Property files are handed to the worker processes in parts of this size
+PARSE_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Parts of a file handed to the worker processes ahead of the writer
+PARSE_CHUNKS_AHEAD = 2
+
+# Archives are extracted next to the archive into this directory
+EXTRACT_DIR_PREFIX = 'EXTRACT_'
+
+# Fingerprint engine of new databases
+DEFAULT_FINGERPRINT = fingerprint.BLAKE2B
+
+# Nested archives read while streaming are kept in memory up to this size
+ARCHIVE_SPILL_MB = 64
+
+# Identity of a sale, the same sale is released weekly and yearly
+SALES_NATURAL_KEY = [
+    property_parser.PropertyData.PROPERTY_ID,
+    property_parser.PropertyData.DISTRICT_CODE,
+    property_parser.PropertyData.CONTRACT_DATE,
+    property_parser.PropertyData.PURCHASE_PRICE,
+]
+
+# Where a sale was read from, not part of its content
+SALES_SOURCE_FIELDS = [
+    property_parser.PropertyData.FILE_NAME,
+    property_parser.PropertyData.LINE_NO,
+]
+
+ON_CONFLICT_IGNORE = 'ignore'
+ON_CONFLICT_UPDATE = 'update'
+
+FieldTuple = property_parser.FieldTuple
+SqlRow = property_parser.SqlRow
+
 
 def parse_args() -> argparse.Namespace:
     """Set up command line arguments for Transdump."""
     parser = argparse.ArgumentParser()
     parser.add_argument('dir',
                         help='Base search Dir for property Files')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Worker processes parsing Property files, '
+                             '0 to parse in the parse threads')
+    parser.add_argument('--fingerprint-threads', type=int, default=2,
+                        help='Threads calculating the file checksums')
+    parser.add_argument('--extract-threads', type=int, default=1,
+                        help='Threads extracting archives')
+    parser.add_argument('--parse-threads', type=int, default=1,
+                        help='Threads parsing Property files, at least '
+                             'one per worker process')
+    parser.add_argument('--stream-archives', action='store_true',
+                        help='Parse archive members straight from the '
+                             'archive instead of extracting them to disk')
+    parser.add_argument('--archive-spill-mb', type=int,
+                        default=ARCHIVE_SPILL_MB,
+                        help='Size up to which nested archives are kept in '
+                             'memory while streaming')
+    parser.add_argument('--fingerprint', choices=fingerprint.ENGINE_NAMES,
+                        help='Checksum identifying processed files, by '
+                             'default the one the database was created with')
+    parser.add_argument('--migrate-fingerprints', action='store_true',
+                        help='Recalculate the checksums of the scanned '
+                             'files with the --fingerprint engine first')
+    parser.add_argument('--no-stat-cache', action='store_true',
+                        help='Checksum all files, even if their size, '
+                             'modification time and inode are unchanged')
+    parser.add_argument('--preload-scanned-files', action='store_true',
+                        help='Keep the keys of all scanned files in memory '
+                             'to look up only known files in the DB')
+    parser.add_argument('--db-backend', choices=db_store.INSERT_BACKENDS,
+                        default=db_store.SQLALCHEMY_BACKEND,
+                        help='Insert the properties as SQLAlchemy '
+                             'statements or straight through sqlite3')
+    parser.add_argument('--normalized', action='store_true',
+                        help='Store districts, zones, suburbs and streets '
+                             'in tables of their own for a new database')
+    parser.add_argument('--on-conflict',
+                        choices=[ON_CONFLICT_IGNORE, ON_CONFLICT_UPDATE],
+                        default=ON_CONFLICT_UPDATE,
+                        help='Keep sales already stored or update them if '
+                             'their content changed')
+    parser.add_argument('--commit-rows', type=int, default=1000000,
+                        help='Maximum properties buffered per commit')
+    parser.add_argument('--commit-mb', type=int, default=256,
+                        help='Approximate memory of the properties buffered '
+                             'per commit, 0 for no limit')
+    parser.add_argument('--commit-seconds', type=float, default=0,
+                        help='Adapt the commit size to the insert rate so '
+                             'commits take about this long, 0 to disable')
+    parser.add_argument('--bulk-load', action='store_true',
+                        help='Tune the database for a large initial load, '
+                             'a power failure can lose the last commits')
+    parser.add_argument('--queue-log-interval', type=float, default=10.0,
+                        help='Seconds between logging the queue depths, '
+                             '0 to disable')
     return parser.parse_args()
 
 
@@ -33,28 +135,54 @@ def validate_args(args: argparse.Namespace) -> None:
     if (not os.path.exists(args.dir)) or (not os.path.isdir(args.dir)):
         raise ValueError(F'"{args.dir}" is not a vaid directory')
 
+    if args.workers < 0:
+        raise ValueError(F'Invalid worker count "{args.workers}"')
+
+    for thread_count in (args.fingerprint_threads, args.extract_threads,
+                         args.parse_threads):
+        if thread_count < 1:
+            raise ValueError(F'Invalid thread count "{thread_count}"')
+
+    if args.archive_spill_mb < 0:
+        raise ValueError(F'Invalid spill size "{args.archive_spill_mb}"')
+
+    if args.commit_rows < 1:
+        raise ValueError(F'Invalid commit size "{args.commit_rows}"')
+
+    if args.commit_mb < 0 or args.commit_seconds < 0:
+        raise ValueError('Invalid commit memory or duration')
+
+    if args.migrate_fingerprints and not args.fingerprint:
+        raise ValueError('Migrating fingerprints requires --fingerprint')
+
+
+class FileStatKey(NamedTuple):
+    """Stat values telling if a file changed since it was fingerprinted."""
+
+    size: int
+    mtime_ns: int
+    inode: int
 
-def file_size(file_path) -> int:
-    """Get the file size in bytes of the given file."""
-    return os.path.getsize(file_path)
 
+class CachedFingerprint(NamedTuple):
+    """Fingerprint of a file with the stat it was calculated for."""
 
-def checksum_adler32(file_path) -> int:
-    """Calculate the adler32 checksum of the given file."""
-    csum = 1
-    with open(file_path, "rb") as file_handle:
-        for chunk in iter(lambda: file_handle.read(65536), b""):
-            csum = zlib.adler32(chunk, csum)
-    csum = csum & 0xffffffff
-    return csum
+    stat_key: FileStatKey
+    fingerprint: str
+    checksum: str
 
 
-def setup_scanned_file(sql_data_manager: db_store.DataManager, file_path: str,
-                       extracted_from=None):
-    """Set up the scanned file object for this file."""
-    size = file_size(file_path)
-    checksum = checksum_adler32(file_path)
+def file_stat_key(file_path: str) -> FileStatKey:
+    """Get the stat values of the given file."""
+    stat = os.stat(file_path)
+    return FileStatKey(stat.st_size, stat.st_mtime_ns, stat.st_ino)
 
+
+def register_scanned_file(sql_data_manager: db_store.DataManager,
+                          file_path: str, size: int, checksum: str,
+                          extracted_from: Optional[int] = None
+                          ) -> db_store.ScannedFile:
+    """Set up the scanned file object for the fingerprinted file."""
     db_file_entry = sql_data_manager.find_scanned_file(size, checksum)
     if not db_file_entry:
         db_file_entry = db_store.ScannedFile(
@@ -65,55 +193,225 @@ def setup_scanned_file(sql_data_manager: db_store.DataManager, file_path: str,
     return db_file_entry
 
 
-def write_property_to_sql(sql_data_manager: db_store.DataManager,
-                          property_file: property_parser.PropertyFile) -> None:
-    """Write the Property file data to SQL."""
-    property_data = property_file.get_lines_as_list()
+def iter_line_chunks(stream: IO[bytes],
+                     chunk_bytes: int = PARSE_CHUNK_BYTES
+                     ) -> Iterator[Tuple[int, bytes]]:
+    """Split a binary stream into parts of whole lines.
 
-    sql_data_manager.add_property_list(property_data)
+    Yields the number of the first line and the data of each part, a part
+    only exceeds the chunk size for a longer line.
+    """
+    line_no = 1
+    rest = b''
+    for block in iter(functools.partial(stream.read, chunk_bytes), b''):
+        data = rest + block
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            rest = data
+            continue
+        yield line_no, data[:end]
+        line_no += data.count(b'\n', 0, end)
+        rest = data[end:]
 
+    if rest:
+        yield line_no, rest
 
-def get_csv_keys() -> List[str]:
-    """Create a list of csv keys."""
-    key_list = []
-    ignore_keys: List[property_parser.PropertyData] = []
 
-    for field in property_parser.PropertyData:
-        if field not in ignore_keys:
-            key_list.append(field.value)
+def parse_property_chunk(
+        property_class: Type[property_parser.PropertyFile],
+        file_path: str, first_line_no: int, data: bytes,
+        typed_fields: FrozenSet[property_parser.PropertyData] = frozenset()
+) -> List[SqlRow]:
+    """Parse a part of a Property file, run by the worker processes.
 
-    logger.debug(F'Created Key List: {key_list}')
+    Tuples are returned instead of Property objects or dictionaries to keep
+    the data pickled back to the writer process small. The file is passed
+    in parts of whole lines, so neither the data sent to a worker nor the
+    rows sent back grow with the file size.
+    """
+    property_file = property_class(
+        file_path, functools.partial(io.BytesIO, data), first_line_no)
+    return [row for rows in iter_property_rows(
+        property_file, len(data) + 1, typed_fields) for row in rows]
 
-    return key_list
 
+def iter_property_rows(
+        property_file: property_parser.PropertyFile,
+        batch_size: int = PARSE_BATCH_SIZE,
+        typed_fields: FrozenSet[property_parser.PropertyData] = frozenset()
+) -> Iterator[List[SqlRow]]:
+    """Parse a Property file into batches of field tuples.
 
-def write_property_to_csv(csv_path: str,
-                          property_file: property_parser.PropertyFile) -> None:
-    """Write the parsed log file to a csv file."""
-    write_header = not os.path.exists(csv_path)
+    The typed fields are converted for the typed SalesData schema, all
+    other fields are kept as strings.
+    """
+    convert = property_parser.compile_row_converter(typed_fields)
+    rows = []
+    for prop in property_file.iter_records():
+        rows.append(convert(prop.get_field_tuple()))
+        if len(rows) >= batch_size:
+            yield rows
+            rows = []
 
-    # Get the data to write (List of Dics to write)
-    csv_data = property_file.get_lines_as_list()
+    if rows:
+        yield rows
 
-    logger.info(F'Writing/Appending to: "{csv_path}"')
-    with open(csv_path, 'a', encoding='utf-8') as csv_file:
-        dict_writer = csv.DictWriter(csv_file, delimiter=',',
-                                     lineterminator='\n',
-                                     extrasaction='ignore',
-                                     fieldnames=get_csv_keys())
-        if write_header:
-            logger.debug(F'Writing Header Row')
-            dict_writer.writeheader()
-        logger.debug(F'Writing {len(csv_data)} entries')
-        dict_writer.writerows(csv_data)
 
+def skip_property_rows(row_batches: Iterable[List[SqlRow]],
+                       count: int) -> Iterator[List[SqlRow]]:
+    """Drop the first rows of the batches, committed by an earlier run."""
+    for rows in row_batches:
+        if count >= len(rows):
+            count -= len(rows)
+            continue
+        yield rows[count:]
+        count = 0
 
-def parse_path(sql_data_manager: db_store.DataManager, path: str,
-               csv_path: str, parent_file_id=None) -> None:
-    """Parse the path for Property files."""
-    logger.info(F'Parse "{path}", ParentFileId: "{parent_file_id}"')
 
-    for root, _, files in os.walk(path):
+def write_property_rows_to_sql(sql_data_manager: db_store.DataManager,
+                               rows: List[SqlRow],
+                               batch_size: int = PARSE_BATCH_SIZE,
+                               file_id: Optional[int] = None) -> int:
+    """Write parsed field tuples to SQL batch by batch."""
+    for start in range(0, len(rows), batch_size):
+        sql_data_manager.add_property_rows(rows[start:start + batch_size],
+                                           file_id)
+
+    return len(rows)
+
+
+def remove_extraction_dir(dest_dir: str) -> None:
+    """Delete an archive extraction directory again."""
+    logger.debug(F'Deleting Extration directory "{dest_dir}"')
+    try:
+        shutil.rmtree(dest_dir)
+    except OSError as error:
+        logger.exception(
+            F'Failed to delete "{dest_dir}", Error: "{error}"')
+    else:
+        logger.debug('Deletion Succeeded')
+
+
+def get_fingerprint_engine(sql_data_manager: db_store.DataManager) -> str:
+    """Get the fingerprint engine the database was created with."""
+    last_scanned_file = sql_data_manager.find_last_scanned_file()
+    if last_scanned_file is None:
+        return DEFAULT_FINGERPRINT
+    return fingerprint.engine_of_checksum(str(last_scanned_file.checksum))
+
+
+def extraction_member_name(file_path: str, archive_path: str) -> Optional[str]:
+    """Get the member name of a file extracted or streamed from an archive."""
+    root, filename = os.path.split(archive_path)
+    for member_root in (os.path.join(root, EXTRACT_DIR_PREFIX + filename),
+                        archive_path):
+        if file_path.startswith(member_root + os.sep):
+            return os.path.relpath(file_path, member_root).replace(
+                os.sep, '/')
+    return None
+
+
+def open_scanned_archive(db_file_entry: db_store.ScannedFile,
+                         spill_bytes: int) -> archive_mgr.ZipArchive:
+    """Open a scanned archive, nested archives are read from their parent."""
+    parent_entry = db_file_entry.extracted_from
+    if parent_entry is None:
+        return archive_mgr.open_archive(db_file_entry.full_path)
+
+    name = extraction_member_name(
+        db_file_entry.full_path, parent_entry.full_path)
+    if name is None:
+        raise archive_mgr.ExtractionError(
+            F'"{db_file_entry.full_path}" not in "{parent_entry.full_path}"')
+    with open_scanned_archive(parent_entry, spill_bytes) as parent_archive:
+        return parent_archive.open_nested(name, spill_bytes)
+
+
+def migrate_fingerprints(sql_data_manager: db_store.DataManager,
+                         engine_name: str, threads: int,
+                         spill_bytes: int) -> None:
+    """Recalculate the checksums of the scanned files with another engine.
+
+    Files on disk are rehashed in parallel, extracted files are read from
+    their archive. The old checksum is verified while rehashing, files that
+    are gone or changed keep their old checksum.
+    """
+    scanned_files = sql_data_manager.get_scanned_files()
+    outdated = [
+        db_file_entry for db_file_entry in scanned_files
+        if fingerprint.engine_of_checksum(
+            str(db_file_entry.checksum)) != engine_name]
+    logger.info(F'Migrating {len(outdated)} Scanned Files to {engine_name}')
+
+    # Files on disk, a path revised in place is registered once per
+    # content, each entry is verified against its own old checksum
+    disk_entries = [db_file_entry for db_file_entry in outdated
+                    if db_file_entry.extracted_from_id is None]
+    disk_checksums = fingerprint.rehash_files(
+        [(db_file_entry.full_path, str(db_file_entry.checksum))
+         for db_file_entry in disk_entries],
+        engine_name, threads)
+    checksums: Dict[int, Optional[str]] = {
+        db_file_entry.id: disk_checksums.get(
+            (db_file_entry.full_path, str(db_file_entry.checksum)))
+        for db_file_entry in disk_entries}
+
+    # Files extracted from archives, each archive is opened once
+    members: Dict[int, List[db_store.ScannedFile]] = (
+        collections.defaultdict(list))
+    for db_file_entry in outdated:
+        if db_file_entry.extracted_from_id is not None:
+            members[db_file_entry.extracted_from_id].append(db_file_entry)
+
+    for member_entries in members.values():
+        archive_entry = member_entries[0].extracted_from
+        try:
+            with open_scanned_archive(archive_entry, spill_bytes) as archive:
+                for db_file_entry in member_entries:
+                    name = extraction_member_name(
+                        db_file_entry.full_path, archive_entry.full_path)
+                    if name is None:
+                        continue
+                    with archive.open_member(name) as member_file:
+                        checksums[db_file_entry.id] = (
+                            fingerprint.rehash_stream(
+                                member_file, str(db_file_entry.checksum),
+                                engine_name))
+        except (archive_mgr.ExtractionError, KeyError, OSError) as error:
+            logger.error(F'Failed to read "{archive_entry.full_path}": '
+                         F'{error}')
+
+    # The content may be registered with the new engine already
+    scanned_keys = {(db_file_entry.size_bytes, db_file_entry.checksum)
+                    for db_file_entry in scanned_files}
+    migrated = 0
+    for db_file_entry in outdated:
+        checksum = checksums.get(db_file_entry.id)
+        if checksum is None:
+            logger.warning(F'Keeping the checksum of '
+                           F'"{db_file_entry.full_path}", gone or changed')
+            continue
+        if (db_file_entry.size_bytes, checksum) in scanned_keys:
+            logger.warning(F'Keeping the checksum of '
+                           F'"{db_file_entry.full_path}", registered with '
+                           F'{engine_name} already')
+            continue
+        scanned_keys.add((db_file_entry.size_bytes, checksum))
+        db_file_entry.checksum = checksum
+        migrated += 1
+
+    logger.info(F'Migrated {migrated} of {len(outdated)} Scanned Files')
+
+
+def iter_candidate_files(path: str) -> Iterator[str]:
+    """Find the archives and Property files in the path.
+
+    Extraction directories are skipped, the extracted files are found by
+    the stage extracting the archive while the path may still be walked.
+    """
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [dir_name for dir_name in dirs
+                   if not dir_name.startswith(EXTRACT_DIR_PREFIX)]
         for filename in files:
             file_path = os.path.join(root, filename)
             logger.info(F'Process "{file_path}"')
@@ -125,63 +423,604 @@ def parse_path(sql_data_manager: db_store.DataManager, path: str,
                 logger.info(F'Cannot Parse "{file_path}", SKIP')
                 continue
 
-            # Setup Scanned file in the DB
-            db_file_entry = setup_scanned_file(sql_data_manager,
-                                               file_path, parent_file_id)
+            yield file_path
+
+
+class WalkJob(NamedTuple):
+    """Path to search for files, the root path or an extraction dir."""
+
+    path: str
+    parent_file_id: Optional[int]
+
+
+class FingerprintJob(NamedTuple):
+    """File found in a walked path or a streamed archive.
+
+    Only the fingerprints of walked files are cached, extracted files are
+    new files on every run.
+    """
+
+    file_path: str
+    parent_file_id: Optional[int]
+    member: Optional[archive_mgr.ArchiveMember] = None
+    cacheable: bool = False
+
+
+class ExtractJob(NamedTuple):
+    """Registered archive to extract or to open for streaming."""
+
+    file_id: int
+    file_path: str
+    dest_dir: str
+    member: Optional[archive_mgr.ArchiveMember] = None
+
+
+class ParseJob(NamedTuple):
+    """Registered Property file to parse."""
+
+    file_id: int
+    property_class: Type[property_parser.PropertyFile]
+    file_path: str
+    member: Optional[archive_mgr.ArchiveMember] = None
+
+    # Rows committed by an interrupted earlier run
+    skip_rows: int = 0
+
+
+class ListedFiles(NamedTuple):
+    """Number of files found for the root path or an archive.
+
+    The extraction dir or the streamed archive are cleaned up once all the
+    files are finished.
+    """
+
+    parent_file_id: Optional[int]
+    dest_dir: Optional[str]
+    file_count: int
+    archive: Optional[archive_mgr.ZipArchive] = None
+
+
+class FingerprintedFile(NamedTuple):
+    """File with its size and checksum, ready to be registered."""
+
+    file_path: str
+    parent_file_id: Optional[int]
+    size: int
+    checksum: str
+    member: Optional[archive_mgr.ArchiveMember] = None
+
+    # Set if the checksum was calculated and should be cached
+    stat_key: Optional[FileStatKey] = None
+
+
+class ParsedRows(NamedTuple):
+    """Batch of parsed rows of a Property file."""
+
+    file_id: int
+    rows: List[SqlRow]
+
+
+class ParsedFile(NamedTuple):
+    """Property file with all its rows parsed."""
+
+    file_id: int
+    property_count: int
 
-            # Don't process the file if done previously
-            if db_file_entry.processed:
-                logger.info(F'Skipping, File previously processed')
-                continue
 
-            # Check file for extraction
-            if archive_mgr.file_is_archive(file_path):
-                dest_dir = os.path.join(root, 'EXTRACT_' + filename)
-                logger.info(F'Extracting "{file_path}" to "{dest_dir}"')
-                try:
-                    archive_mgr.extract(file_path, dest_dir)
-                except archive_mgr.ExtractionError as error:
-                    logger.exception('Extraction Error: "{error}"')
-                else:
-                    # Recursion - Check the Extracted folder for Files as well
-                    parse_path(sql_data_manager, dest_dir, csv_path,
-                               db_file_entry.id)
-
-                    # Commit for each archive to not delay too much
-                    sql_data_manager.commit()
-
-                    # Delete the created folder again
-                    logger.debug(F'Deleting Extration directory "{dest_dir}"')
-                    try:
-                        shutil.rmtree(dest_dir)
-                    except OSError as error:
-                        logger.exception(
-                            F'Failed to delete "{dest_dir}", Error: "{error}"')
-                    else:
-                        logger.debug('Deletion Succeeded')
+class StageFailed(NamedTuple):
+    """Error raised in a pipeline stage."""
 
+    stage: str
+    error: Exception
+
+
+PipelineEvent = Union[ListedFiles, FingerprintedFile, ParsedRows, ParsedFile,
+                      StageFailed]
+
+
+class PipelineSettings(NamedTuple):
+    """Worker counts and queue sizes of the parse pipeline stages.
+
+    Parse processes are used by the parse threads, so there should be at
+    least as many parse threads to keep all the processes busy.
+    """
+
+    fingerprint_threads: int = 2
+    extract_threads: int = 1
+    parse_threads: int = 1
+    parse_processes: int = 0
+    fingerprint_queue_size: int = 256
+    write_queue_size: int = 16
+    queue_log_interval: float = 10.0
+    stream_archives: bool = False
+    fingerprint: str = DEFAULT_FINGERPRINT
+    stat_cache: bool = True
+    archive_spill_bytes: int = ARCHIVE_SPILL_MB * 1024 * 1024
+    typed_fields: FrozenSet[property_parser.PropertyData] = frozenset()
+
+
+class PipelineWriter():
+    """Single writer of the parse pipeline, owning the DataManager session.
+
+    Registers the fingerprinted files, hands them on to the extract and parse
+    stages and writes the parsed rows. A file is flagged as processed once
+    all its rows are handed to the DataManager and an archive once all files
+    extracted from it are, the same as when parsing serially. The writer
+    never blocks on the stages it feeds, their queues are unbounded.
+    """
+
+    def __init__(self, sql_data_manager: db_store.DataManager,
+                 extract_stage: 'ingest_pipeline.Stage[ExtractJob]',
+                 parse_stage: 'ingest_pipeline.Stage[ParseJob]',
+                 root_file_id: Optional[int], fingerprint_engine: str,
+                 file_stats: Dict[str, db_store.FileStat]) -> None:
+        """Initialize the Pipeline Writer."""
+        self._sql_data_manager = sql_data_manager
+        self._fingerprint_engine = fingerprint_engine
+        self._file_stats = file_stats
+        self._extract_stage = extract_stage
+        self._parse_stage = parse_stage
+        self._root_file_id = root_file_id
+        self._done = False
+
+        # Files registered but not flagged as processed yet
+        self._active: Dict[int, db_store.ScannedFile] = {}
+        self._parent_ids: Dict[int, Optional[int]] = {}
+
+        # Files of the root path and archives not finished yet, an archive
+        # is listed with its extraction dir once its file count is known
+        self._open_files: Dict[Optional[int], int] = (
+            collections.defaultdict(int))
+        self._listed: Dict[Optional[int], ListedFiles] = {}
+
+    def run(self, events: 'queue.Queue[PipelineEvent]') -> None:
+        """Handle the pipeline events until the root path is finished."""
+        while not self._done:
+            event = events.get()
+            if isinstance(event, ParsedRows):
+                write_property_rows_to_sql(
+                    self._sql_data_manager, event.rows,
+                    file_id=event.file_id)
+            elif isinstance(event, FingerprintedFile):
+                self._register(event)
+            elif isinstance(event, ParsedFile):
+                logger.info(
+                    F'Export complete for '
+                    F'"{self._active[event.file_id].full_path}", '
+                    F'{event.property_count} Properties')
+                self._finish(event.file_id)
+            elif isinstance(event, ListedFiles):
+                self._open_files[event.parent_file_id] += event.file_count
+                self._listed[event.parent_file_id] = event
+                self._check_archive_finished(event.parent_file_id)
+            elif isinstance(event, StageFailed):
+                raise event.error
             else:
-                # Process the file as property file
-                try:
-                    property_class = prop_mgr.get_property_file_from_path(
-                        file_path)
-                    property_file = property_class(file_path)
-                except ValueError as error:
-                    logger.error(F'Failed to Identify Property File: {error}')
-                else:
-                    logger.info('Parse Log File')
-                    property_file.parse()
-                    logger.info('Parsing complete')
+                raise ValueError(F'Unknown pipeline event "{event}"')
+
+    def _register(self, event: FingerprintedFile) -> None:
+        if event.stat_key is not None:
+            self._cache_fingerprint(event)
+
+        db_file_entry = register_scanned_file(
+            self._sql_data_manager, event.file_path, event.size,
+            event.checksum, event.parent_file_id)
+
+        # Don't process the file if done previously
+        if db_file_entry.processed:
+            logger.info(F'Skipping "{event.file_path}", '
+                        F'File previously processed')
+            self._file_done(event.parent_file_id)
+            return
+        if db_file_entry.id in self._active:
+            logger.info(F'Skipping "{event.file_path}", '
+                        F'File already queued')
+            self._file_done(event.parent_file_id)
+            return
+
+        self._active[db_file_entry.id] = db_file_entry
+        self._parent_ids[db_file_entry.id] = event.parent_file_id
+
+        # Check file for extraction
+        if archive_mgr.file_is_archive(event.file_path):
+            root, filename = os.path.split(event.file_path)
+            dest_dir = os.path.join(root, EXTRACT_DIR_PREFIX + filename)
+            self._extract_stage.put(ExtractJob(
+                db_file_entry.id, event.file_path, dest_dir, event.member))
+            return
+
+        # Process the file as property file
+        try:
+            property_class = prop_mgr.get_property_file_from_path(
+                event.file_path)
+        except ValueError as error:
+            logger.error(F'Failed to Identify Property File: {error}')
+            self._finish(db_file_entry.id)
+        else:
+            # Continue after the rows committed by an interrupted run
+            skip_rows = self._sql_data_manager.find_checkpoint(
+                db_file_entry.id)
+            if skip_rows:
+                logger.info(F'Resuming "{event.file_path}" after '
+                            F'{skip_rows} committed Properties')
+            self._parse_stage.put(ParseJob(
+                db_file_entry.id, property_class, event.file_path,
+                event.member, skip_rows))
+
+    def _cache_fingerprint(self, event: FingerprintedFile) -> None:
+        stat_key = cast(FileStatKey, event.stat_key)
+        file_stat = self._file_stats.get(event.file_path)
+        if file_stat is None:
+            file_stat = db_store.FileStat(full_path=event.file_path)
+            self._file_stats[event.file_path] = file_stat
+            self._sql_data_manager.add_file_stat(file_stat)
+
+        file_stat.size_bytes = stat_key.size
+        file_stat.mtime_ns = stat_key.mtime_ns
+        file_stat.inode = stat_key.inode
+        file_stat.fingerprint = self._fingerprint_engine
+        file_stat.checksum = event.checksum
+
+    def _finish(self, file_id: int) -> None:
+        # Flag the File as Processed
+        self._sql_data_manager.set_processed(self._active.pop(file_id))
+        self._file_done(self._parent_ids.pop(file_id))
+
+    def _file_done(self, parent_file_id: Optional[int]) -> None:
+        self._open_files[parent_file_id] -= 1
+        self._check_archive_finished(parent_file_id)
+
+    def _check_archive_finished(self, parent_file_id: Optional[int]) -> None:
+        if ((parent_file_id not in self._listed) or
+                (self._open_files[parent_file_id] != 0)):
+            return
+
+        listed = self._listed.pop(parent_file_id)
+        del self._open_files[parent_file_id]
+        if parent_file_id == self._root_file_id:
+            self._done = True
+            return
+
+        # Commit for each archive to not delay too much
+        self._sql_data_manager.commit()
+
+        # Delete the created folder again
+        if listed.dest_dir is not None:
+            remove_extraction_dir(listed.dest_dir)
+        if listed.archive is not None:
+            listed.archive.close()
+
+        self._finish(cast(int, parent_file_id))
+
+
+class ParsePipeline():
+    """Parse a path in stages: walk, fingerprint, extract, parse and write.
+
+    The stages run in worker threads connected by queues, only the writer
+    runs in the calling thread. Checksums and zip decompression release the
+    GIL, so they overlap with parsing and writing. Parsing itself can be
+    handed on to a process pool. The queue to the fingerprint stage and the
+    queue to the writer are bounded, the walk blocks while the fingerprints
+    are behind and the parse stage blocks while the writer is behind.
+    """
+
+    def __init__(self, settings: PipelineSettings,
+                 batch_size: int = PARSE_BATCH_SIZE,
+                 executor: Optional[concurrent.futures.Executor] = None
+                 ) -> None:
+        """Initialize the Parse Pipeline."""
+        self._settings = settings
+        self._batch_size = batch_size
+        self._executor = executor
+        self._events: 'queue.Queue[PipelineEvent]' = queue.Queue(
+            settings.write_queue_size)
+
+        self._walk_stage = ingest_pipeline.Stage(
+            'walk', self._walk, self._stage_failed)
+        self._fingerprint_stage = ingest_pipeline.Stage(
+            'fingerprint', self._fingerprint, self._stage_failed,
+            settings.fingerprint_threads, settings.fingerprint_queue_size)
+        self._extract_stage = ingest_pipeline.Stage(
+            'extract', self._extract, self._stage_failed,
+            settings.extract_threads)
+        self._parse_stage = ingest_pipeline.Stage(
+            'parse', self._parse, self._stage_failed,
+            settings.parse_threads)
+
+        # Fingerprints of unchanged files, read by the fingerprint stage
+        self._cached_fingerprints: Dict[str, CachedFingerprint] = {}
+        self._cache_hits = 0
+        self._cache_lock = threading.Lock()
+
+        self._stages: List[ingest_pipeline.StageControl] = [
+            self._walk_stage, self._fingerprint_stage, self._extract_stage,
+            self._parse_stage]
+
+    def run(self, sql_data_manager: db_store.DataManager, path: str,
+            parent_file_id: Optional[int] = None) -> None:
+        """Parse the path and write the Properties to the DataManager."""
+        file_stats: Dict[str, db_store.FileStat] = {}
+        if self._settings.stat_cache:
+            file_stats = sql_data_manager.load_file_stats()
+
+        # The stages only read this copy, the writer owns the DB objects
+        self._cached_fingerprints = {
+            full_path: CachedFingerprint(
+                FileStatKey(file_stat.size_bytes, file_stat.mtime_ns,
+                            file_stat.inode),
+                file_stat.fingerprint, file_stat.checksum)
+            for full_path, file_stat in file_stats.items()}
+
+        writer = PipelineWriter(
+            sql_data_manager, self._extract_stage, self._parse_stage,
+            parent_file_id, self._settings.fingerprint, file_stats)
+
+        depth_sources: Dict[str, Callable[[], int]] = {
+            stage.name: stage.depth for stage in self._stages}
+        depth_sources['write'] = self._events.qsize
+        maxsizes = {stage.name: stage.maxsize for stage in self._stages}
+        maxsizes['write'] = self._settings.write_queue_size
+        monitor = ingest_pipeline.QueueMonitor(
+            depth_sources, maxsizes, self._settings.queue_log_interval)
+
+        for stage in self._stages:
+            stage.start()
+        monitor.start()
+        try:
+            self._walk_stage.put(WalkJob(path, parent_file_id))
+            writer.run(self._events)
+        finally:
+            monitor.stop()
+
+        # All queues are empty once the writer is done
+        for stage in self._stages:
+            stage.stop()
+        logger.info(F'Fingerprint Cache Hits: {self._cache_hits}, '
+                    F'Cached Files: {len(file_stats)}')
+        max_depths = {stage.name: stage.max_depth for stage in self._stages}
+        logger.info(F'Max Queue Depths: '
+                    F'{ingest_pipeline.format_depths(max_depths, maxsizes)}')
+
+    def _stage_failed(self, _: object, error: Exception) -> None:
+        self._events.put(StageFailed(threading.current_thread().name, error))
+
+    def _list_files(self, path: str, parent_file_id: Optional[int],
+                    dest_dir: Optional[str]) -> None:
+        # The file count goes to the writer before any of the files
+        file_paths = list(iter_candidate_files(path))
+        self._events.put(
+            ListedFiles(parent_file_id, dest_dir, len(file_paths)))
+        for file_path in file_paths:
+            self._fingerprint_stage.put(FingerprintJob(
+                file_path, parent_file_id,
+                cacheable=self._settings.stat_cache and dest_dir is None))
+
+    def _walk(self, job: WalkJob) -> None:
+        logger.info(F'Parse "{job.path}", ParentFileId: '
+                    F'"{job.parent_file_id}"')
+        self._list_files(job.path, job.parent_file_id, None)
+
+    def _fingerprint(self, job: FingerprintJob) -> None:
+        if job.member is not None:
+            size, checksum = fingerprint.fingerprint_member(
+                job.member, self._settings.fingerprint)
+            self._events.put(FingerprintedFile(
+                job.file_path, job.parent_file_id, size, checksum,
+                job.member))
+            return
+
+        if not job.cacheable:
+            size, checksum = fingerprint.fingerprint_file(
+                job.file_path, self._settings.fingerprint)
+            self._events.put(FingerprintedFile(
+                job.file_path, job.parent_file_id, size, checksum))
+            return
+
+        # Skip the checksum if the file is unchanged since cached
+        stat_key = file_stat_key(job.file_path)
+        cached = self._cached_fingerprints.get(job.file_path)
+        if ((cached is not None) and (cached.stat_key == stat_key) and
+                (cached.fingerprint == self._settings.fingerprint)):
+            with self._cache_lock:
+                self._cache_hits += 1
+            self._events.put(FingerprintedFile(
+                job.file_path, job.parent_file_id, stat_key.size,
+                cached.checksum))
+            return
+
+        size, checksum = fingerprint.fingerprint_file(
+            job.file_path, self._settings.fingerprint)
+        self._events.put(FingerprintedFile(
+            job.file_path, job.parent_file_id, size, checksum,
+            stat_key=stat_key))
+
+    def _extract(self, job: ExtractJob) -> None:
+        if self._settings.stream_archives or job.member is not None:
+            self._open_archive(job)
+            return
+
+        logger.info(F'Extracting "{job.file_path}" to "{job.dest_dir}"')
+        try:
+            archive_mgr.extract(job.file_path, job.dest_dir)
+        except archive_mgr.ExtractionError as error:
+            logger.exception(F'Extraction Error: "{error}"')
+            self._events.put(ListedFiles(job.file_id, None, 0))
+        else:
+            # Check the Extracted folder for Files as well
+            logger.info(F'Parse "{job.dest_dir}", ParentFileId: '
+                        F'"{job.file_id}"')
+            self._list_files(job.dest_dir, job.file_id, job.dest_dir)
+
+    def _open_archive(self, job: ExtractJob) -> None:
+        logger.info(F'Streaming "{job.file_path}"')
+        try:
+            if job.member is not None:
+                archive = job.member.open_archive(
+                    self._settings.archive_spill_bytes)
+            else:
+                archive = archive_mgr.open_archive(job.file_path)
+        except archive_mgr.ExtractionError as error:
+            logger.exception(F'Extraction Error: "{error}"')
+            self._events.put(ListedFiles(job.file_id, None, 0))
+            return
+
+        # Only archives or Property files allowed
+        members = []
+        for name in archive.member_names():
+            file_path = os.path.join(job.file_path, name)
+            if ((not archive_mgr.file_is_archive(name)) and
+                    (not prop_mgr.file_can_be_parsed(name))):
+                logger.info(F'Cannot Parse "{file_path}", SKIP')
+                continue
+            members.append((file_path, archive_mgr.ArchiveMember(
+                archive, name)))
+
+        # The file count goes to the writer before any of the files
+        self._events.put(
+            ListedFiles(job.file_id, None, len(members), archive))
+        for file_path, member in members:
+            self._fingerprint_stage.put(
+                FingerprintJob(file_path, job.file_id, member))
+
+    def _parse(self, job: ParseJob) -> None:
+        logger.info(F'Parse "{job.file_path}"')
+        if self._executor is not None:
+            row_batches = self._iter_worker_rows(job, self._executor)
+        else:
+            opener = None if job.member is None else job.member.open
+            row_batches = iter_property_rows(
+                job.property_class(job.file_path, opener), self._batch_size,
+                self._settings.typed_fields)
+
+        property_count = 0
+        for rows in skip_property_rows(row_batches, job.skip_rows):
+            self._events.put(ParsedRows(job.file_id, rows))
+            property_count += len(rows)
+        self._events.put(ParsedFile(job.file_id, property_count))
+
+    def _iter_worker_rows(self, job: ParseJob,
+                          executor: concurrent.futures.Executor
+                          ) -> Iterator[List[SqlRow]]:
+        # The next parts are read and parsed while the writer takes the rows
+        # of a part, the parts ahead are bounded to keep the memory bounded
+        pending: Deque['concurrent.futures.Future[List[SqlRow]]'] = (
+            collections.deque())
+        if job.member is not None:
+            prop_file = job.member.open()
+        else:
+            prop_file = open(job.file_path, 'rb')
+        with prop_file:
+            for first_line_no, data in iter_line_chunks(
+                    prop_file, PARSE_CHUNK_BYTES):
+                pending.append(executor.submit(
+                    parse_property_chunk, job.property_class, job.file_path,
+                    first_line_no, data, self._settings.typed_fields))
+                if len(pending) > PARSE_CHUNKS_AHEAD:
+                    yield from self._split_rows(pending.popleft().result())
+        while pending:
+            yield from self._split_rows(pending.popleft().result())
+
+    def _split_rows(self, rows: List[SqlRow]) -> Iterator[List[SqlRow]]:
+        for start in range(0, len(rows), self._batch_size):
+            yield rows[start:start + self._batch_size]
+
+
+def parse_path(sql_data_manager: db_store.DataManager, path: str,
+               parent_file_id: Optional[int] = None,
+               batch_size: int = PARSE_BATCH_SIZE,
+               settings: PipelineSettings = PipelineSettings()) -> None:
+    """Parse the path for Property files."""
+    if settings.parse_processes:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=settings.parse_processes,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            ParsePipeline(settings, batch_size, executor).run(
+                sql_data_manager, path, parent_file_id)
+    else:
+        ParsePipeline(settings, batch_size).run(
+            sql_data_manager, path, parent_file_id)
+
+
+def get_typed_fields(sales_data: db_store.SalesDataStore
+                     ) -> FrozenSet[property_parser.PropertyData]:
+    """Get the fields stored with a SQL type other than text."""
+    column_types = sales_data.column_types()
+    typed_fields = frozenset(
+        fld for fld in property_parser.PropertyData
+        if column_types.get(str(fld.value), str) is not str)
+    if not typed_fields:
+        logger.warning('SalesData was created with the untyped schema, '
+                       'all fields are stored as text')
+    return typed_fields
+
+
+def get_sales_dimensions() -> List[db_store.Dimension]:
+    """Get the dimensions of normalized SalesData with the known values."""
+    # Only the new zone codes have a zone type
+    zone_rows: List[Tuple[Optional[str], ...]] = [
+        (code, zone, None)
+        for code, zone in nsw_def.get_old_zone_codes().items()]
+    zone_rows += [
+        (code, zone, zone_type)
+        for code, (zone, zone_type) in nsw_def.get_new_zone_codes().items()]
+    return [
+        db_store.Dimension(
+            'district', [property_parser.PropertyData.DISTRICT_CODE.value,
+                         property_parser.PropertyData.DISTRICT.value],
+            list(nsw_def.get_district_codes().items())),
+        db_store.Dimension(
+            'zone', [property_parser.PropertyData.ZONE_CODE.value,
+                     property_parser.PropertyData.ZONE.value,
+                     property_parser.PropertyData.ZONE_TYPE.value],
+            zone_rows),
+        db_store.Dimension(
+            'suburb', [property_parser.PropertyData.SUBBURB.value]),
+        db_store.Dimension(
+            'street', [property_parser.PropertyData.STREET_NAME.value]),
+    ]
+
+
+def process_dir(database: db_store.SqliteDb,
+                args: argparse.Namespace) -> None:
+    """Parse the directory into the database."""
+    sales_data = database.sales_data
+    if sales_data is None:
+        raise ValueError('The database has to be created first')
+
+    with database.session_scope() as session:
+        commit_policy = db_store.CommitPolicy(
+            args.commit_rows, args.commit_mb * 1024 * 1024,
+            args.commit_seconds)
+        with db_store.DataManager(
+                session, args.commit_rows, args.db_backend,
+                sales_data, args.on_conflict == ON_CONFLICT_UPDATE,
+                commit_policy) as sql_data_manager:
+            fingerprint_engine = (args.fingerprint or
+                                  get_fingerprint_engine(sql_data_manager))
+            logger.info(F'Fingerprint Engine: {fingerprint_engine}')
+            if args.migrate_fingerprints:
+                migrate_fingerprints(
+                    sql_data_manager, fingerprint_engine,
+                    args.fingerprint_threads,
+                    args.archive_spill_mb * 1024 * 1024)
 
-                    # logger.info('Export to CSV')
-                    # write_property_to_csv(csv_path, property_file)
+            if args.preload_scanned_files:
+                sql_data_manager.preload_scanned_files()
 
-                    logger.info('Export to SQL')
-                    write_property_to_sql(sql_data_manager, property_file)
-                    logger.info('Export complete')
+            settings = PipelineSettings(
+                fingerprint_threads=args.fingerprint_threads,
+                extract_threads=args.extract_threads,
+                parse_threads=max(args.parse_threads, args.workers),
+                parse_processes=args.workers,
+                queue_log_interval=args.queue_log_interval,
+                stream_archives=args.stream_archives,
+                fingerprint=fingerprint_engine,
+                stat_cache=not args.no_stat_cache,
+                archive_spill_bytes=args.archive_spill_mb * 1024 * 1024,
+                typed_fields=get_typed_fields(sales_data))
 
-            # Flag the File as Processed
-            db_file_entry.processed = True
+            # Process Log Dir
+            parse_path(sql_data_manager, args.dir, settings=settings)
 
 
 def main() -> None:
@@ -198,17 +1037,28 @@ def main() -> None:
 
     db_path = os.path.join(args.dir, F'ParseResult_Properties.sql')
     with db_store.SqliteDb(db_path) as database:
-        if not os.path.exists(db_path):
-            columns = [str(fld.value) for fld in property_parser.PropertyData]
-            database.create(columns)
+        # Creates missing tables only, maps the tables of an existing DB
+        columns = [str(fld.value) for fld in property_parser.PropertyData]
+        column_types = {
+            str(fld.value): sql_type
+            for fld, sql_type in property_parser.SQL_FIELD_TYPES.items()}
+        database.create(columns, column_types, get_sales_dimensions(),
+                        args.normalized,
+                        [str(fld.value) for fld in SALES_NATURAL_KEY],
+                        [str(fld.value) for fld in SALES_SOURCE_FIELDS])
 
-        with database.session_scope() as session:
-            with db_store.DataManager(session, 1000000) as sql_data_manager:
+        if args.bulk_load:
+            with database.bulk_load():
+                process_dir(database, args)
+        else:
+            process_dir(database, args)
 
-                # Process Log Dir
-                parse_path(
-                    sql_data_manager, args.dir,
-                    os.path.join(args.dir, F'ParseResult_Properties.csv'))
+    # Worker processes parse with caches and pools of their own, not
+    # reported here
+    if not args.workers:
+        logger.info(property_parser.date_cache_info())
+        logger.info(
+            F'String Pool Size: {len(property_parser.STRING_POOL)}')
 
 
 if __name__ == '__main__':
@@ -4,6 +4,8 @@
 
 import enum
 
+from typing import Dict, Tuple
+
 _DISTRICT_CODES = {
     '001': 'CESSNOCK',
     '002': 'DUNGOG',
@@ -341,3 +343,19 @@ def get_type_from_new_zone_code(zone_code: str) -> str:
             return str(zone_tup[1].value)
     else:
         return ''
+
+
+def get_district_codes() -> Dict[str, str]:
+    """Get all District names by District code."""
+    return dict(_DISTRICT_CODES)
+
+
+def get_old_zone_codes() -> Dict[str, str]:
+    """Get all Zones by Old Zone code."""
+    return dict(_ZONE_CODES_OLD)
+
+
+def get_new_zone_codes() -> Dict[str, Tuple[str, str]]:
+    """Get the Zone and Zone Type of all New Zone codes."""
+    return {zone_code: (zone, str(zone_type.value))
+            for zone_code, (zone, zone_type) in _ZONE_CODES_NEW.items()}
@@ -2,13 +2,21 @@
 
 """Module to handle Generic Property Log parsing."""
 
-import collections
 import datetime
+import decimal
 import enum
+import functools
+import io
 import logging
+import math
+import mmap
 import os
 
-from typing import Dict, List, Iterator
+from array import array
+
+from typing import (IO, Callable, ClassVar, Dict, Iterable, List, Iterator,
+                    NamedTuple, Optional, Sequence, Tuple, Type, TypeVar,
+                    Union, cast)
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
@@ -55,60 +63,542 @@ class PropertyData(enum.Enum):
     # pylint: enable=invalid-name
 
 
+# Fixed field positions of the Property record, ordered like PropertyData
+_FIELD_KEYS: Tuple[str, ...] = tuple(str(fld.value) for fld in PropertyData)
+_FIELD_SLOTS: Dict[PropertyData, int] = {
+    fld: idx for idx, fld in enumerate(PropertyData)}
+_FILE_NAME_SLOT = _FIELD_SLOTS[PropertyData.FILE_NAME]
+_LINE_NO_SLOT = _FIELD_SLOTS[PropertyData.LINE_NO]
+
+
+# Columns of a ColumnBatch stored as float arrays, missing values are NaN
+NUMERIC_FIELDS = frozenset([
+    PropertyData.AREA,
+    PropertyData.PURCHASE_PRICE
+])
+
+# Low cardinality fields, their strings are shared through the STRING_POOL
+CATEGORICAL_FIELDS = frozenset([
+    PropertyData.FILE_NAME,
+    PropertyData.AREA_TYPE,
+    PropertyData.DISTRICT_CODE,
+    PropertyData.DISTRICT,
+    PropertyData.STREET_NAME,
+    PropertyData.SUBBURB,
+    PropertyData.POST_CODE,
+    PropertyData.NATURE_OF_PROPERTY,
+    PropertyData.PRIMARY_PURPOSE,
+    PropertyData.ZONE_CODE,
+    PropertyData.ZONE,
+    PropertyData.ZONE_TYPE
+])
+
+
+class StringPool():
+    """Bounded pool to share the strings of repeated field values.
+
+    intern(value, value) returns the pooled string equal to value, adding it
+    if missing. Once trim() finds more than max_size strings, the pool is
+    emptied, strings already shared stay shared.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize the string pool."""
+        self.max_size = max_size
+        self._strings: Dict[str, str] = {}
+        self.intern = self._strings.setdefault
+
+    def trim(self) -> None:
+        """Empty the pool if it grew over its maximum size."""
+        if len(self._strings) > self.max_size:
+            logger.debug(F'String Pool Size {len(self._strings)}, Clear')
+            self._strings.clear()
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+STRING_POOL = StringPool(1000000)
+
+# Line numbers below this are converted to shared strings
+_LINE_NO_CACHE_SIZE = 65536
+_LINE_NO_STRINGS = [str(line_no) for line_no in range(_LINE_NO_CACHE_SIZE)]
+
+
+def line_no_to_str(line_no: int) -> str:
+    """Convert a line number to a string, shared for common numbers."""
+    if line_no < _LINE_NO_CACHE_SIZE:
+        return _LINE_NO_STRINGS[line_no]
+    return str(line_no)
+
+
+class FieldSpec(NamedTuple):
+    """Layout entry mapping a column of a split line to a Property field."""
+
+    column: int
+    target: PropertyData
+    converter: Optional[Callable[[str], str]] = None
+
+
+FieldExtractor = Callable[[Sequence[str]], List[Optional[str]]]
+RawFieldExtractor = Callable[[Sequence[bytes]], List[Optional[str]]]
+RawFieldGetter = Callable[[Sequence[bytes]], str]
+
+
+def decode_field(raw_field: bytes) -> str:
+    """Strip and decode a raw field, falling back to latin-1 if not utf8."""
+    raw_field = raw_field.strip()
+    try:
+        return raw_field.decode('utf8')
+    except UnicodeDecodeError:
+        return raw_field.decode('latin-1')
+
+
+def _build_extractor(layout: Sequence[FieldSpec], column_reader: str,
+                     namespace: Dict[str, object],
+                     fallback_reader: Optional[str] = None) -> object:
+    """Generate the extractor function for the given layout.
+
+    The generated function reads every column used by the layout once with
+    the given column reader, applies the converters and returns the Property
+    values in field order, so the per line cost does not depend on loops
+    over the layout. If the column reader raises a UnicodeDecodeError the
+    columns are read again with the fallback reader. Unconverted categorical
+    fields are shared through the STRING_POOL.
+    """
+    namespace['intern'] = STRING_POOL.intern
+    columns: Dict[int, str] = {}
+    values = ['None'] * len(_FIELD_KEYS)
+
+    for spec_idx, spec in enumerate(layout):
+        slot = _FIELD_SLOTS[spec.target]
+        if values[slot] != 'None':
+            raise ValueError(F'Field "{spec.target.value}" mapped twice')
+
+        if spec.column not in columns:
+            columns[spec.column] = F'col{spec.column}'
+        value = columns[spec.column]
+
+        if spec.converter is not None:
+            converter_name = F'convert{spec_idx}'
+            namespace[converter_name] = spec.converter
+            value = F'{converter_name}({value})'
+        elif spec.target in CATEGORICAL_FIELDS:
+            value = F'intern({value}, {value})'
+        values[slot] = value
+
+    def read_columns(reader: str, indent: str) -> List[str]:
+        return [F'{indent}{name} = ' + reader.format(F'fields[{column}]')
+                for column, name in sorted(columns.items())]
+
+    source_lines = ['def extract(fields):']
+    if fallback_reader is None:
+        source_lines += read_columns(column_reader, '    ')
+    else:
+        source_lines.append('    try:')
+        source_lines += read_columns(column_reader, '        ')
+        source_lines.append('    except UnicodeDecodeError:')
+        source_lines += read_columns(fallback_reader, '        ')
+    source_lines.append(F'    return [{", ".join(values)}]')
+
+    # The source is generated from the layout only, never from file content
+    exec(compile('\n'.join(source_lines), '<layout>', 'exec'),  # nosec
+         namespace)
+    return namespace['extract']
+
+
+def compile_layout(layout: Sequence[FieldSpec]) -> FieldExtractor:
+    """Compile a column layout into an extractor for split text lines."""
+    return cast(FieldExtractor, _build_extractor(layout, '{}.strip()', {}))
+
+
+def compile_raw_layout(layout: Sequence[FieldSpec]) -> RawFieldExtractor:
+    """Compile a column layout into an extractor for split raw lines.
+
+    Only the columns used by the layout are decoded, if one of them is not
+    valid utf8 the line is decoded again with decode_field.
+    """
+    return cast(RawFieldExtractor, _build_extractor(
+        layout, '{}.strip().decode("utf8")', {'decode': decode_field},
+        fallback_reader='decode({})'))
+
+
+def _compile_raw_field_getter(spec: FieldSpec) -> RawFieldGetter:
+    """Create the getter of a single field from a split raw line."""
+    column = spec.column
+
+    if spec.converter is not None:
+        converter = spec.converter
+
+        def get_converted(fields: Sequence[bytes]) -> str:
+            return converter(decode_field(fields[column]))
+        return get_converted
+
+    if spec.target in CATEGORICAL_FIELDS:
+        def get_shared(fields: Sequence[bytes]) -> str:
+            value = decode_field(fields[column])
+            return STRING_POOL.intern(value, value)
+        return get_shared
+
+    def get_plain(fields: Sequence[bytes]) -> str:
+        return decode_field(fields[column])
+    return get_plain
+
+
+def compile_raw_field_getters(
+        layout: Sequence[FieldSpec]) -> Dict[int, RawFieldGetter]:
+    """Compile a column layout into one getter per Property field slot."""
+    return {_FIELD_SLOTS[spec.target]: _compile_raw_field_getter(spec)
+            for spec in layout}
+
+
+PropertyT = TypeVar('PropertyT', bound='Property')
+
+# Field values of a Property in PropertyData order, None for unset fields
+FieldTuple = Tuple[Optional[str], ...]
+
+
+def field_tuple_to_dic(values: Sequence[Optional[str]]) -> Dict[str, str]:
+    """Convert field values in PropertyData order into a field dictionary."""
+    return {key: value for key, value in zip(_FIELD_KEYS, values)
+            if value is not None}
+
+
+# Field values converted for a typed SQL schema
+SqlValue = Optional[Union[str, int, float]]
+SqlRow = Tuple[SqlValue, ...]
+RowConverter = Callable[[Sequence[Optional[str]]], SqlRow]
+
+
+# Range of the integers SQLite stores, larger values can't be bound
+SQL_INT_MIN = -2 ** 63
+SQL_INT_MAX = 2 ** 63 - 1
+
+# Largest adjusted exponent of a decimal that can be in the SQL int range
+_SQL_INT_MAX_EXPONENT = len(str(SQL_INT_MAX)) - 1
+
+
+def _sql_int(value: int) -> Optional[int]:
+    """Keep an integer in the SQL int range, other values become None."""
+    return value if SQL_INT_MIN <= value <= SQL_INT_MAX else None
+
+
+def to_int(value: str) -> Optional[int]:
+    """Convert an integer field, missing or invalid values become None."""
+    try:
+        return _sql_int(int(value))
+    except ValueError:
+        return None
+
+
+def to_real(value: str) -> Optional[float]:
+    """Convert a real field, missing or invalid values become None."""
+    try:
+        real = float(value)
+    except ValueError:
+        return None
+    return real if math.isfinite(real) else None
+
+
+def price_to_cents(value: str) -> Optional[int]:
+    """Convert a dollar price to integer cents without rounding errors."""
+    try:
+        cents = decimal.Decimal(value) * 100
+    except (decimal.DecimalException, ValueError):
+        return None
+    # Checked before converting, huge exponents make huge ints
+    if ((not cents.is_finite()) or
+            (cents.adjusted() > _SQL_INT_MAX_EXPONENT)):
+        return None
+    return _sql_int(int(cents))
+
+
+def date_to_int(value: str) -> Optional[int]:
+    """Convert an internal format date to an integer YYYYMMDD.
+
+    The internal format is '%Y/%M/%d', the month is stored in the minute
+    position, so the digits are taken as they are. Missing dates like N/A
+    become None.
+    """
+    parts = value.split('/')
+    if (len(parts) == 3 and len(parts[0]) == 4 and len(parts[1]) == 2 and
+            len(parts[2]) == 2 and ''.join(parts).isdigit()):
+        return int(''.join(parts))
+    return None
+
+
+# Python type stored in SQL and converter of the fields not stored as text
+SQL_FIELD_TYPES: Dict[PropertyData, type] = {
+    PropertyData.LINE_NO: int,
+    PropertyData.AREA: float,
+    PropertyData.POST_CODE: int,
+    PropertyData.CONTRACT_DATE: int,
+    PropertyData.SETTLEMENT_DATE: int,
+    PropertyData.PURCHASE_PRICE: int,
+}
+SQL_FIELD_CONVERTERS: Dict[PropertyData, Callable[[str], SqlValue]] = {
+    PropertyData.LINE_NO: to_int,
+    PropertyData.AREA: to_real,
+    PropertyData.POST_CODE: to_int,
+    PropertyData.CONTRACT_DATE: date_to_int,
+    PropertyData.SETTLEMENT_DATE: date_to_int,
+    PropertyData.PURCHASE_PRICE: price_to_cents,
+}
+
+
+def compile_row_converter(fields: Iterable[PropertyData]) -> RowConverter:
+    """Create the converter of field values for the given typed fields.
+
+    Fields without a converter in SQL_FIELD_CONVERTERS are kept as strings,
+    as are all fields of a database created with the untyped schema.
+    """
+    converters = [(_FIELD_SLOTS[field], SQL_FIELD_CONVERTERS[field])
+                  for field in fields if field in SQL_FIELD_CONVERTERS]
+
+    def convert(values: Sequence[Optional[str]]) -> SqlRow:
+        row: List[SqlValue] = list(values)
+        for slot, converter in converters:
+            value = values[slot]
+            if value is not None:
+                row[slot] = converter(value) if value else None
+        return tuple(row)
+    return convert
+
+
 class Property():
-    """Property Line base class."""
+    """Property Line base class.
+
+    The fields are kept in a fixed size list indexed by the position of the
+    PropertyData member instead of a dictionary per line, fields which have
+    not been set are stored as None.
+
+    Subclasses describe their line format in LAYOUT, which is compiled once
+    per class into the extractors used by parse() and from_raw_line().
+    """
+
+    __slots__ = ('line', '_values')
+
+    FIELD_SEPARATOR: ClassVar[str] = ';'
+    LAYOUT: ClassVar[Sequence[FieldSpec]] = ()
+    _extract: ClassVar[Optional[FieldExtractor]] = None
+    _extract_raw: ClassVar[Optional[RawFieldExtractor]] = None
+    _raw_separator: ClassVar[bytes] = b';'
+
+    def __init_subclass__(cls) -> None:
+        """Compile the layout of the subclass."""
+        super().__init_subclass__()
+        if cls.LAYOUT:
+            cls._extract = compile_layout(cls.LAYOUT)
+            cls._extract_raw = compile_raw_layout(cls.LAYOUT)
+            cls._raw_separator = cls.FIELD_SEPARATOR.encode('ascii')
 
     def __init__(self, line: str) -> None:
         """Initialize Property Line."""
         self.line = line
 
-        self._fields: Dict[str, str] = collections.defaultdict(str)
+        self._values: List[Optional[str]] = [None] * len(_FIELD_KEYS)
 
     def parse(self) -> bool:
         """Parse the property line."""
-        raise NotImplementedError
+        extract = type(self)._extract
+        if extract is None:
+            raise NotImplementedError
+
+        self._values = extract(self.line.split(self.FIELD_SEPARATOR))
+        return True
+
+    @classmethod
+    def from_raw_line(cls: Type[PropertyT], raw_line: bytes) -> PropertyT:
+        """Create and parse a property from an undecoded file line.
+
+        Only the columns used by the layout are decoded, the decoded line
+        itself is not kept.
+        """
+        prop = cls('')
+        prop._values = cls.extract_raw_values(raw_line)
+        return prop
+
+    @classmethod
+    def extract_raw_values(cls, raw_line: bytes) -> List[Optional[str]]:
+        """Extract the field values of an undecoded line in field order."""
+        extract_raw = cls._extract_raw
+        if extract_raw is None:
+            raise NotImplementedError
+
+        return extract_raw(raw_line.split(cls._raw_separator))
+
+    def set_source(self, file_name: str, line_no: str) -> None:
+        """Set the file name and line number fields."""
+        self._values[_FILE_NAME_SLOT] = file_name
+        self._values[_LINE_NO_SLOT] = line_no
 
     def get_field_dic(self) -> Dict[str, str]:
         """Get a list of all the fields as dictionaries."""
-        return self._fields
+        return field_tuple_to_dic(self._values)
 
-    @staticmethod
-    def _keytransform(key: PropertyData) -> str:
-        return str(key.value)
+    def get_field_tuple(self) -> FieldTuple:
+        """Get the field values in PropertyData order, None if unset."""
+        return tuple(self._values)
 
     def __setitem__(self, key: PropertyData, value: str) -> None:
-        self._fields[self._keytransform(key)] = value
+        self._values[_FIELD_SLOTS[key]] = value
 
     def __getitem__(self, key: PropertyData) -> str:
-        return self._fields[self._keytransform(key)]
+        value = self._values[_FIELD_SLOTS[key]]
+        return '' if value is None else value
 
     def __iter__(self) -> Iterator[str]:
-        return iter(self._fields)
+        return (key for key, value in zip(_FIELD_KEYS, self._values)
+                if value is not None)
 
     def __len__(self) -> int:
-        return len(self._fields)
+        return len(self._values) - self._values.count(None)
 
     def __str__(self) -> str:
-        return str(self._fields)
+        return str(self.get_field_dic())
 
     def __delitem__(self, key: PropertyData) -> None:
-        del self._fields[self._keytransform(key)]
+        slot = _FIELD_SLOTS[key]
+        if self._values[slot] is None:
+            raise KeyError(key.value)
+        self._values[slot] = None
+
+
+class LazyProperty(Property):
+    """Property variant converting each field on first access.
+
+    The undecoded line is kept and only split once a field is read, every
+    field is decoded, converted and looked up the first time it is accessed.
+    Concrete classes combine it with a Property subclass providing LAYOUT,
+    e.g. class NswNewLazyProperty(LazyProperty, NswNewProperty).
+    """
+
+    __slots__ = ('_raw_line', '_raw_fields', '_pending')
+
+    _raw_getters: ClassVar[Dict[int, RawFieldGetter]] = {}
+    _layout_mask: ClassVar[int] = 0
+    _min_separators: ClassVar[int] = 0
+
+    def __init_subclass__(cls) -> None:
+        """Compile the field getters of the subclass."""
+        super().__init_subclass__()
+        if cls.LAYOUT:
+            cls._raw_getters = compile_raw_field_getters(cls.LAYOUT)
+            cls._layout_mask = sum(1 << slot for slot in cls._raw_getters)
+            cls._min_separators = max(spec.column for spec in cls.LAYOUT)
+
+    def __init__(self, line: str) -> None:
+        """Initialize Property Line."""
+        super().__init__(line)
+        self._raw_line = b''
+        self._raw_fields: Optional[List[bytes]] = None
+
+        # Bit mask of the field slots not converted yet
+        self._pending = 0
+
+    @classmethod
+    def from_raw_line(cls: Type[PropertyT], raw_line: bytes) -> PropertyT:
+        """Create a property from an undecoded line without parsing it.
+
+        Only the number of columns is checked, lines too short for the
+        layout raise an IndexError like the eager parsing.
+        """
+        if not issubclass(cls, LazyProperty) or not cls._raw_getters:
+            raise NotImplementedError
+        if raw_line.count(cls._raw_separator) < cls._min_separators:
+            raise IndexError('Not enough columns for the layout')
+
+        prop = cls('')
+        prop._raw_line = raw_line
+        prop._pending = cls._layout_mask
+        return prop
+
+    def _resolve(self, slot: int) -> None:
+        """Convert the field of the given slot from the raw line."""
+        if self._raw_fields is None:
+            self._raw_fields = self._raw_line.split(self._raw_separator)
+        self._values[slot] = self._raw_getters[slot](self._raw_fields)
+        self._pending &= ~(1 << slot)
+
+    def _resolve_all(self) -> None:
+        """Convert all pending fields."""
+        for slot in self._raw_getters:
+            if self._pending >> slot & 1:
+                self._resolve(slot)
+
+    def get_field_dic(self) -> Dict[str, str]:
+        """Get a list of all the fields as dictionaries."""
+        self._resolve_all()
+        return super().get_field_dic()
+
+    def get_field_tuple(self) -> FieldTuple:
+        """Get the field values in PropertyData order, None if unset."""
+        self._resolve_all()
+        return super().get_field_tuple()
+
+    def __setitem__(self, key: PropertyData, value: str) -> None:
+        self._pending &= ~(1 << _FIELD_SLOTS[key])
+        super().__setitem__(key, value)
+
+    def __getitem__(self, key: PropertyData) -> str:
+        slot = _FIELD_SLOTS[key]
+        if self._pending >> slot & 1:
+            self._resolve(slot)
+        return super().__getitem__(key)
+
+    def __iter__(self) -> Iterator[str]:
+        self._resolve_all()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self._resolve_all()
+        return super().__len__()
+
+    def __delitem__(self, key: PropertyData) -> None:
+        slot = _FIELD_SLOTS[key]
+        if self._pending >> slot & 1:
+            self._resolve(slot)
+        super().__delitem__(key)
+
+
+# Opens the binary stream of a property file, e.g. of an archive member
+StreamOpener = Callable[[], IO[bytes]]
 
 
 class PropertyFile():
     """Property File base class."""
 
-    def __init__(self, file_path: str):
-        """Initialize the generic property file."""
+    # Parse the file as bytes, requires the raw line methods
+    BINARY_PARSE: ClassVar[bool] = False
+
+    # Files from this size on are scanned through a memory map
+    MMAP_THRESHOLD_BYTES: ClassVar[int] = 64 * 1024 * 1024
+
+    # Property classes parsing the lines of this file
+    PROPERTY_CLASS: ClassVar[Optional[Type[Property]]] = None
+    LAZY_PROPERTY_CLASS: ClassVar[Optional[Type[Property]]] = None
+
+    def __init__(self, file_path: str,
+                 opener: Optional[StreamOpener] = None,
+                 first_line_no: int = 1):
+        """Initialize the generic property file.
+
+        With an opener the file is read from the opened stream, the file
+        path is then only used for the file name. A stream holding a part
+        of the file numbers its lines from the first line number.
+        """
+        file_name = os.path.basename(file_path)
         self._file_path = file_path
+        self._opener = opener
+        self._first_line_no = first_line_no
+        self._file_name = STRING_POOL.intern(file_name, file_name)
         self._encoding = 'utf8'
         self._properties: List[Property] = []
         self._idx = 0
 
-    @property
-    def _file_name(self) -> str:
-        """Get the file name."""
-        return os.path.basename(self._file_path)
+        # Offsets and line numbers of the lines of interest, if indexed
+        self._line_offsets: Optional['array[int]'] = None
+        self._line_numbers: Optional['array[int]'] = None
 
     @staticmethod
     def name_allowed(file_name_candidate: str) -> bool:
@@ -123,10 +613,176 @@ class PropertyFile():
         """Check if File line is of interest."""
         raise NotImplementedError
 
-    def parse(self) -> None:
-        """Parse the property file."""
-        with open(self._file_path, 'r', encoding=self._encoding) as prop_file:
-            for idx, raw_line in enumerate(prop_file, start=1):
+    def create_property_from_raw_line(self, raw_line: bytes) -> Property:
+        """Create a parsed property object from an undecoded line."""
+        if self.PROPERTY_CLASS is None:
+            raise NotImplementedError
+        return self.PROPERTY_CLASS.from_raw_line(raw_line)
+
+    def create_lazy_property_from_raw_line(self, raw_line: bytes) -> Property:
+        """Create a lazily parsed property object from an undecoded line."""
+        if self.LAZY_PROPERTY_CLASS is None:
+            raise NotImplementedError
+        return self.LAZY_PROPERTY_CLASS.from_raw_line(raw_line)
+
+    def raw_line_of_interest(self, raw_line: bytes) -> bool:
+        """Check if the undecoded File line is of interest.
+
+        The memory mapped scan only passes the first byte of the line.
+        """
+        raise NotImplementedError
+
+    def iter_records(self, lazy: bool = False) -> Iterator[Property]:
+        """Parse the property file lazily, yielding one property at a time.
+
+        With lazy set the properties only convert the fields accessed, this
+        requires binary parsing.
+        """
+        if self.BINARY_PARSE:
+            return self._iter_records_binary(lazy)
+        if lazy:
+            raise ValueError('Lazy properties require BINARY_PARSE')
+        return self._iter_records_text()
+
+    def _create_record(self, raw_line: bytes, line_no: int,
+                       lazy: bool = False) -> Property:
+        """Create the property for an undecoded line of interest."""
+        try:
+            if lazy:
+                prop = self.create_lazy_property_from_raw_line(raw_line)
+            else:
+                prop = self.create_property_from_raw_line(raw_line)
+        except IndexError as exc:
+            raise ValueError(
+                F'Failed Parsing Line {line_no}: "{raw_line!r}"') from exc
+        prop.set_source(self._file_name, line_no_to_str(line_no))
+        return prop
+
+    def _iter_records_binary(self, lazy: bool) -> Iterator[Property]:
+        """Parse the property file in binary mode.
+
+        Lines are filtered and split as bytes and only the columns used by
+        the property layout get decoded.
+        """
+        for line_no, raw_line in self._iter_raw_lines():
+            yield self._create_record(raw_line, line_no, lazy)
+
+        STRING_POOL.trim()
+
+    def _iter_raw_lines(self) -> Iterator[Tuple[int, bytes]]:
+        """Get the line number and undecoded line of each line of interest.
+
+        Large files are scanned through a memory map.
+        """
+        if ((self._opener is None) and (os.path.getsize(
+                self._file_path) >= self.MMAP_THRESHOLD_BYTES)):
+            with open(self._file_path, 'rb') as prop_file:
+                if os.fstat(prop_file.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(prop_file.fileno(), 0,
+                               access=mmap.ACCESS_READ) as buffer:
+                    for line_no, start, end in self._scan_mmap(buffer):
+                        yield line_no, buffer[start:end]
+        else:
+            with self._open_binary() as prop_file:
+                for line_no, raw_line in enumerate(
+                        prop_file, start=self._first_line_no):
+                    if self.raw_line_of_interest(raw_line):
+                        yield line_no, raw_line
+
+    def _open_binary(self) -> IO[bytes]:
+        """Open the property file or its stream in binary mode."""
+        if self._opener is not None:
+            return self._opener()
+        return open(self._file_path, 'rb')
+
+    def _scan_mmap(self, buffer: mmap.mmap) -> Iterator[Tuple[int, int, int]]:
+        """Find the lines of interest in the mapped file.
+
+        Yields the line number, start and end offset of each line of
+        interest, no other line is copied out of the buffer.
+        """
+        size = len(buffer)
+        line_no = self._first_line_no - 1
+        start = 0
+        while start < size:
+            end = buffer.find(b'\n', start)
+            end = size if end == -1 else end + 1
+            line_no += 1
+            if self.raw_line_of_interest(buffer[start:start + 1]):
+                yield line_no, start, end
+            start = end
+
+    def iter_column_batches(self, batch_size: int) -> Iterator['ColumnBatch']:
+        """Parse the property file in batches of columns.
+
+        The field values of each line are collected without creating a
+        Property per line and every batch is transposed into a ColumnBatch.
+        This is a library mode for column wise analysis, the SQL ingestion
+        converts Properties into typed rows instead.
+        """
+        if batch_size < 1:
+            raise ValueError(F'Invalid batch size: {batch_size}')
+        if self.PROPERTY_CLASS is None:
+            raise NotImplementedError
+
+        extract_values = self.PROPERTY_CLASS.extract_raw_values
+        file_name = self._file_name
+        rows: List[List[Optional[str]]] = []
+        line_numbers = array('q')
+
+        for line_no, raw_line in self._iter_raw_lines():
+            try:
+                rows.append(extract_values(raw_line))
+            except IndexError as exc:
+                raise ValueError(
+                    F'Failed Parsing Line {line_no}: "{raw_line!r}"') from exc
+            line_numbers.append(line_no)
+
+            if len(rows) >= batch_size:
+                yield ColumnBatch(rows, file_name, line_numbers)
+                rows = []
+                line_numbers = array('q')
+
+        if rows:
+            yield ColumnBatch(rows, file_name, line_numbers)
+
+        STRING_POOL.trim()
+
+    def build_line_index(self) -> None:
+        """Index the lines of interest without parsing them.
+
+        Once indexed, single properties are parsed on access by index.
+        Requires the file on disk, streams can't be indexed.
+        """
+        if self._opener is not None:
+            raise ValueError('Streamed files cannot be indexed')
+
+        self._line_offsets = array('q')
+        self._line_numbers = array('q')
+
+        with open(self._file_path, 'rb') as prop_file:
+            if os.fstat(prop_file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(prop_file.fileno(), 0,
+                           access=mmap.ACCESS_READ) as buffer:
+                for line_no, start, _ in self._scan_mmap(buffer):
+                    self._line_offsets.append(start)
+                    self._line_numbers.append(line_no)
+
+    def _read_record_at(self, offset: int, line_no: int) -> Property:
+        """Read and parse the single property line at the given offset."""
+        with open(self._file_path, 'rb') as prop_file:
+            prop_file.seek(offset)
+            raw_line = prop_file.readline()
+        return self._create_record(raw_line, line_no)
+
+    def _iter_records_text(self) -> Iterator[Property]:
+        """Parse the property file in text mode."""
+        with io.TextIOWrapper(self._open_binary(),
+                              encoding=self._encoding) as prop_file:
+            for idx, raw_line in enumerate(prop_file,
+                                           start=self._first_line_no):
                 line = raw_line.strip()
                 if self.line_of_interest(line):
                     # For now let's assume we only need a single line for each
@@ -136,11 +792,15 @@ class PropertyFile():
                     prop = self.create_property_from_line(line)
                     if prop.parse():
                         prop[PropertyData.FILE_NAME] = self._file_name
-                        prop[PropertyData.LINE_NO] = str(idx)
-                        self._properties.append(prop)
+                        prop[PropertyData.LINE_NO] = line_no_to_str(idx)
+                        yield prop
                     else:
                         raise ValueError(F'Failed Parsing Line: "{line}"')
 
+    def parse(self) -> None:
+        """Parse the property file."""
+        self._properties.extend(self.iter_records())
+
     def get_lines_as_list(self) -> List[Dict[str, str]]:
         """Get a list of all the properties."""
         data_list = []
@@ -157,25 +817,157 @@ class PropertyFile():
 
     def __next__(self) -> Property:
         try:
-            item = self._properties[self._idx]
+            item = self[self._idx]
         except IndexError:
             raise StopIteration()
         self._idx += 1
         return item
 
     def __len__(self) -> int:
-        return len(self._properties)
+        if self._properties or self._line_offsets is None:
+            return len(self._properties)
+        return len(self._line_offsets)
 
     def __getitem__(self, idx: int) -> Property:
-        return self._properties[idx]
+        if (self._properties or self._line_offsets is None or
+                self._line_numbers is None):
+            return self._properties[idx]
+        return self._read_record_at(self._line_offsets[idx],
+                                    self._line_numbers[idx])
+
+
+def _to_float(value: Optional[str]) -> float:
+    """Convert a numeric field, missing or invalid values become NaN."""
+    try:
+        return float(value) if value else math.nan
+    except ValueError:
+        return math.nan
+
+
+class ColumnBatch():
+    """Batch of parsed properties stored as one sequence per field.
+
+    Numeric fields are stored in float arrays as well, which can be used by
+    NumPy through numpy.frombuffer without copying. Line numbers are stored
+    in an integer array and all fields as lists of the source strings or
+    None, so the rows are returned exactly as parsed.
+    """
+
+    def __init__(self, rows: Sequence[Sequence[Optional[str]]],
+                 file_name: str, line_numbers: 'array[int]') -> None:
+        """Transpose the parsed rows into columns."""
+        self._row_count = len(rows)
+        self.line_numbers = line_numbers
+        self._text_columns: Dict[PropertyData, List[Optional[str]]] = {}
+        self._numeric_columns: Dict[PropertyData, 'array[float]'] = {}
+
+        columns = list(zip(*rows)) if rows else [()] * len(_FIELD_KEYS)
+        for field, column in zip(PropertyData, columns):
+            if field is PropertyData.LINE_NO:
+                continue
+            if field is PropertyData.FILE_NAME:
+                self._text_columns[field] = [file_name] * self._row_count
+            elif field in NUMERIC_FIELDS:
+                self._numeric_columns[field] = array(
+                    'd', [_to_float(value) for value in column])
+                self._text_columns[field] = list(column)
+            elif field in CATEGORICAL_FIELDS:
+                self._text_columns[field] = [
+                    STRING_POOL.intern(value, value) if value else value
+                    for value in column]
+            else:
+                self._text_columns[field] = list(column)
+
+    def text_column(self, field: PropertyData) -> List[Optional[str]]:
+        """Get a string column, numeric columns as the source strings."""
+        return self._text_columns[field]
+
+    def numeric_column(self, field: PropertyData) -> 'array[float]':
+        """Get a numeric column, missing values are NaN."""
+        return self._numeric_columns[field]
+
+    def iter_rows(self) -> Iterator[Tuple[Optional[str], ...]]:
+        """Get the rows as string tuples in PropertyData order."""
+        columns: List[Sequence[Optional[str]]] = []
+        for field in PropertyData:
+            if field is PropertyData.LINE_NO:
+                columns.append([line_no_to_str(line_no)
+                                for line_no in self.line_numbers])
+            else:
+                columns.append(self._text_columns[field])
+        return zip(*columns)
+
+    def to_dict_list(self) -> List[Dict[str, str]]:
+        """Get the rows as field dictionaries like Property.get_field_dic."""
+        return [{key: value for key, value in zip(_FIELD_KEYS, row)
+                 if value is not None}
+                for row in self.iter_rows()]
+
+    def __len__(self) -> int:
+        return self._row_count
 
 
+# Upper bound of distinct (date, format) pairs memoized for date conversion
+DATE_CACHE_SIZE = 65536
+
+
+def _valid_date_parts(year: str, minute: str, day: str) -> bool:
+    """Check the parts of a date can be converted by slicing."""
+    return (year.isdigit() and minute.isdigit() and day.isdigit() and
+            int(year) >= 1000 and int(minute) <= 59 and 1 <= int(day) <= 31)
+
+
+def _slice_date_ymd(date_str: str) -> Optional[str]:
+    """Convert a '%Y%M%d' date by slicing, None if it needs strptime."""
+    if len(date_str) == 8 and date_str.isascii():
+        year, minute, day = date_str[:4], date_str[4:6], date_str[6:]
+        if _valid_date_parts(year, minute, day):
+            return F'{year}/{minute}/{day}'
+    return None
+
+
+def _slice_date_dmy(date_str: str) -> Optional[str]:
+    """Convert a '%d/%M/%Y' date by slicing, None if it needs strptime."""
+    parts = date_str.split('/')
+    if len(parts) == 3 and date_str.isascii():
+        day, minute, year = parts
+        if (len(day) in (1, 2) and len(minute) in (1, 2) and
+                len(year) == 4 and _valid_date_parts(year, minute, day)):
+            return F'{year}/{minute.zfill(2)}/{day.zfill(2)}'
+    return None
+
+
+_SLICE_DATE_CONVERTERS: Dict[str, Callable[[str], Optional[str]]] = {
+    '%Y%M%d': _slice_date_ymd,
+    '%d/%M/%Y': _slice_date_dmy
+}
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
 def convert_date_to_internal(date_str: str, date_format: str) -> str:
-    """Convert the given date to the internal format."""
+    """Convert the given date to the internal format.
+
+    The known fixed layouts are converted by slicing the string, anything
+    else goes through strptime. Results are memoized, the hit and miss
+    counters are available from date_cache_info().
+    """
+    slice_converter = _SLICE_DATE_CONVERTERS.get(date_format)
+    if slice_converter is not None:
+        internal_date = slice_converter(date_str)
+        if internal_date is not None:
+            return internal_date
+
     return datetime.datetime.strptime(
         date_str, date_format).strftime('%Y/%M/%d')
 
 
+def date_cache_info() -> str:
+    """Get the memoization statistics of convert_date_to_internal."""
+    info = convert_date_to_internal.cache_info()
+    return (F'Date Cache Hits: {info.hits}, Misses: {info.misses}, '
+            F'Size: {info.currsize}/{info.maxsize}')
+
+
 def convert_time_to_internal(time_str: str, time_format: str) -> str:
     """Convert the given time to the internal format."""
     return datetime.datetime.strptime(
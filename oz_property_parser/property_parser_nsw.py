@@ -10,49 +10,77 @@ import property_definitions_nsw as nsw_def
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
-class NswOldProperty(property_parser.Property):
-    """Nsw Old Style format Property File."""
-
-    def parse(self) -> bool:
-        """Parse the property line."""
-        fields = property_parser.split_str(self.line, ';')
+def _convert_old_date(date_str: str) -> str:
+    """Convert an old format date, missing dates are set to N/A."""
+    if date_str:
+        return property_parser.convert_date_to_internal(date_str, '%d/%M/%Y')
+    return 'N/A'
 
-        district_code = fields[1]
-        self[property_parser.PropertyData.DISTRICT_CODE] = district_code
-        self[property_parser.PropertyData.DISTRICT] =\
-            nsw_def.get_district_from_code(district_code)
 
-        self[property_parser.PropertyData.PROPERTY_ID] = fields[4]
-        self[property_parser.PropertyData.UNIT_NUMBER] = fields[5]
-        self[property_parser.PropertyData.HOUSE_NUMBER] = fields[6]
-        self[property_parser.PropertyData.STREET_NAME] = fields[7]
-        self[property_parser.PropertyData.SUBBURB] = fields[8]
-        self[property_parser.PropertyData.POST_CODE] = fields[9]
+def _convert_new_date(date_str: str) -> str:
+    """Convert a new format date, missing dates are set to N/A."""
+    if date_str:
+        return property_parser.convert_date_to_internal(date_str, '%Y%M%d')
+    return 'N/A'
 
-        if fields[10]:
-            to_date = property_parser.convert_date_to_internal(
-                fields[10], '%d/%M/%Y')
-        else:
-            to_date = 'N/A'
-        self[property_parser.PropertyData.CONTRACT_DATE] = to_date
 
-        self[property_parser.PropertyData.PURCHASE_PRICE] = fields[11]
-        self[property_parser.PropertyData.LAND_DESCRIPTIONS] = fields[12]
-        self[property_parser.PropertyData.AREA] = fields[13]
-        self[property_parser.PropertyData.AREA_TYPE] = fields[14]
-        self[property_parser.PropertyData.DIMENSIONS] = fields[15]
-
-        zone_code = fields[16]
-        self[property_parser.PropertyData.ZONE_CODE] = fields[16]
-        self[property_parser.PropertyData.ZONE] =\
-            nsw_def.get_zone_from_old_code(zone_code)
+class NswOldProperty(property_parser.Property):
+    """Nsw Old Style format Property File."""
 
-        return True
+    __slots__ = ()
+
+    LAYOUT = (
+        property_parser.FieldSpec(
+            1, property_parser.PropertyData.DISTRICT_CODE),
+        property_parser.FieldSpec(
+            1, property_parser.PropertyData.DISTRICT,
+            nsw_def.get_district_from_code),
+        property_parser.FieldSpec(
+            4, property_parser.PropertyData.PROPERTY_ID),
+        property_parser.FieldSpec(
+            5, property_parser.PropertyData.UNIT_NUMBER),
+        property_parser.FieldSpec(
+            6, property_parser.PropertyData.HOUSE_NUMBER),
+        property_parser.FieldSpec(
+            7, property_parser.PropertyData.STREET_NAME),
+        property_parser.FieldSpec(
+            8, property_parser.PropertyData.SUBBURB),
+        property_parser.FieldSpec(
+            9, property_parser.PropertyData.POST_CODE),
+        property_parser.FieldSpec(
+            10, property_parser.PropertyData.CONTRACT_DATE,
+            _convert_old_date),
+        property_parser.FieldSpec(
+            11, property_parser.PropertyData.PURCHASE_PRICE),
+        property_parser.FieldSpec(
+            12, property_parser.PropertyData.LAND_DESCRIPTIONS),
+        property_parser.FieldSpec(
+            13, property_parser.PropertyData.AREA),
+        property_parser.FieldSpec(
+            14, property_parser.PropertyData.AREA_TYPE),
+        property_parser.FieldSpec(
+            15, property_parser.PropertyData.DIMENSIONS),
+        property_parser.FieldSpec(
+            16, property_parser.PropertyData.ZONE_CODE),
+        property_parser.FieldSpec(
+            16, property_parser.PropertyData.ZONE,
+            nsw_def.get_zone_from_old_code),
+    )
+
+
+class NswOldLazyProperty(property_parser.LazyProperty, NswOldProperty):
+    """Nsw Old Style format Property, fields are parsed on access."""
+
+    __slots__ = ()
 
 
 class NswOldPropertyFile(property_parser.PropertyFile):
     """Nsw Old Style format Property File."""
 
+    BINARY_PARSE = True
+    PROPERTY_CLASS = NswOldProperty
+    LAZY_PROPERTY_CLASS = NswOldLazyProperty
+
     def create_property_from_line(self, line: str) -> NswOldProperty:
         """Create a property object for this class."""
         return NswOldProperty(line)
@@ -67,61 +95,76 @@ class NswOldPropertyFile(property_parser.PropertyFile):
         """Check if File line is of interest."""
         return line.upper().startswith('B')
 
+    def raw_line_of_interest(self, raw_line: bytes) -> bool:
+        """Check if the undecoded File line is of interest."""
+        return raw_line[:1] in (b'B', b'b')
+
 
 class NswNewProperty(property_parser.Property):
     """Nsw New Style format Property File."""
 
-    def parse(self) -> bool:
-        """Parse the property line."""
-        fields = property_parser.split_str(self.line, ';')
-
-        district_code = fields[1]
-        self[property_parser.PropertyData.DISTRICT_CODE] = district_code
-        self[property_parser.PropertyData.DISTRICT] =\
-            nsw_def.get_district_from_code(district_code)
-
-        self[property_parser.PropertyData.PROPERTY_ID] = fields[2]
-        self[property_parser.PropertyData.UNIT_NUMBER] = fields[6]
-        self[property_parser.PropertyData.HOUSE_NUMBER] = fields[7]
-        self[property_parser.PropertyData.STREET_NAME] = fields[8]
-        self[property_parser.PropertyData.SUBBURB] = fields[9]
-        self[property_parser.PropertyData.POST_CODE] = fields[10]
-        self[property_parser.PropertyData.AREA] = fields[11]
-        self[property_parser.PropertyData.AREA_TYPE] = fields[12]
-
-        if fields[13]:
-            to_date = property_parser.convert_date_to_internal(
-                fields[13], '%Y%M%d')
-        else:
-            to_date = 'N/A'
-        self[property_parser.PropertyData.CONTRACT_DATE] = to_date
-
-        if fields[14]:
-            to_date = property_parser.convert_date_to_internal(
-                fields[14], '%Y%M%d')
-        else:
-            to_date = 'N/A'
-        self[property_parser.PropertyData.SETTLEMENT_DATE] = to_date
-
-        self[property_parser.PropertyData.PURCHASE_PRICE] = fields[15]
-
-        zone_code = fields[16]
-        self[property_parser.PropertyData.ZONE_CODE] = zone_code
-        self[property_parser.PropertyData.ZONE] =\
-            nsw_def.get_zone_from_new_code(zone_code)
-        self[property_parser.PropertyData.ZONE_TYPE] =\
-            nsw_def.get_type_from_new_zone_code(zone_code)
-
-        self[property_parser.PropertyData.NATURE_OF_PROPERTY] = fields[17]
-        self[property_parser.PropertyData.PRIMARY_PURPOSE] = fields[18]
-        self[property_parser.PropertyData.LOT_NUMBER] = fields[19]
-
-        return True
+    __slots__ = ()
+
+    LAYOUT = (
+        property_parser.FieldSpec(
+            1, property_parser.PropertyData.DISTRICT_CODE),
+        property_parser.FieldSpec(
+            1, property_parser.PropertyData.DISTRICT,
+            nsw_def.get_district_from_code),
+        property_parser.FieldSpec(
+            2, property_parser.PropertyData.PROPERTY_ID),
+        property_parser.FieldSpec(
+            6, property_parser.PropertyData.UNIT_NUMBER),
+        property_parser.FieldSpec(
+            7, property_parser.PropertyData.HOUSE_NUMBER),
+        property_parser.FieldSpec(
+            8, property_parser.PropertyData.STREET_NAME),
+        property_parser.FieldSpec(
+            9, property_parser.PropertyData.SUBBURB),
+        property_parser.FieldSpec(
+            10, property_parser.PropertyData.POST_CODE),
+        property_parser.FieldSpec(
+            11, property_parser.PropertyData.AREA),
+        property_parser.FieldSpec(
+            12, property_parser.PropertyData.AREA_TYPE),
+        property_parser.FieldSpec(
+            13, property_parser.PropertyData.CONTRACT_DATE,
+            _convert_new_date),
+        property_parser.FieldSpec(
+            14, property_parser.PropertyData.SETTLEMENT_DATE,
+            _convert_new_date),
+        property_parser.FieldSpec(
+            15, property_parser.PropertyData.PURCHASE_PRICE),
+        property_parser.FieldSpec(
+            16, property_parser.PropertyData.ZONE_CODE),
+        property_parser.FieldSpec(
+            16, property_parser.PropertyData.ZONE,
+            nsw_def.get_zone_from_new_code),
+        property_parser.FieldSpec(
+            16, property_parser.PropertyData.ZONE_TYPE,
+            nsw_def.get_type_from_new_zone_code),
+        property_parser.FieldSpec(
+            17, property_parser.PropertyData.NATURE_OF_PROPERTY),
+        property_parser.FieldSpec(
+            18, property_parser.PropertyData.PRIMARY_PURPOSE),
+        property_parser.FieldSpec(
+            19, property_parser.PropertyData.LOT_NUMBER),
+    )
+
+
+class NswNewLazyProperty(property_parser.LazyProperty, NswNewProperty):
+    """Nsw New Style format Property, fields are parsed on access."""
+
+    __slots__ = ()
 
 
 class NswNewPropertyFile(property_parser.PropertyFile):
     """Nsw New Style format Property File."""
 
+    BINARY_PARSE = True
+    PROPERTY_CLASS = NswNewProperty
+    LAZY_PROPERTY_CLASS = NswNewLazyProperty
+
     def create_property_from_line(self, line: str) -> NswNewProperty:
         """Create a property object for this class."""
         return NswNewProperty(line)
@@ -135,3 +178,7 @@ class NswNewPropertyFile(property_parser.PropertyFile):
     def line_of_interest(self, line: str) -> bool:
         """Check if File line is of interest."""
         return line.upper().startswith('B')
+
+    def raw_line_of_interest(self, raw_line: bytes) -> bool:
+        """Check if the undecoded File line is of interest."""
+        return raw_line[:1] in (b'B', b'b')
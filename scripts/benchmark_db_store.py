@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+"""Benchmark the SalesData insert backends in rows per second.
+
+Both backends execute the same prepared statement, the sqlalchemy backend
+as SQLAlchemy text statement with named parameters, the sqlite3 backend
+straight through the executemany of the sqlite3 connection.
+
+Run from the project root with the package on the path, e.g.
+    PYTHONPATH=oz_property_parser python scripts/benchmark_db_store.py
+    PYTHONPATH=oz_property_parser python scripts/benchmark_db_store.py \
+        path/to/001_SALES_DATA_NNME_15012018.DAT
+
+Without a file a synthetic new format weekly file is generated. The rows
+are parsed once, only inserting and committing them is timed.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from typing import Iterator, List, Tuple
+
+from benchmark_parse_modes import write_synthetic_file
+
+import db_store
+import property_file_manager as prop_mgr
+import property_parser
+
+COMMIT_SIZE = 100000
+
+
+def parse_rows(file_path: str) -> List[property_parser.FieldTuple]:
+    """Parse the property file into field tuples."""
+    property_class = prop_mgr.get_property_file_from_path(file_path)
+    return [record.get_field_tuple()
+            for record in property_class(file_path).iter_records()]
+
+
+def insert_rows(db_path: str, backend: str,
+                rows: List[property_parser.FieldTuple]) -> float:
+    """Insert the rows into a new database, return the seconds taken."""
+    with db_store.SqliteDb(db_path) as database:
+        database.create(
+            [str(fld.value) for fld in property_parser.PropertyData])
+        with database.session_scope() as session:
+            start = time.perf_counter()
+            with db_store.DataManager(session, COMMIT_SIZE, backend,
+                                      database.sales_data) as data_manager:
+                data_manager.add_property_rows(rows)
+            return time.perf_counter() - start
+
+
+def benchmark(dir_path: str, rows: List[property_parser.FieldTuple]
+              ) -> Iterator[Tuple[str, float]]:
+    """Run every insert backend over the rows."""
+    for backend in db_store.INSERT_BACKENDS:
+        db_path = os.path.join(dir_path, F'benchmark_{backend}.sql')
+        yield backend, insert_rows(db_path, backend, rows)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', nargs='?', help='Property file to parse')
+    parser.add_argument('--count', type=int, default=200000,
+                        help='Properties in the synthetic file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = args.file or write_synthetic_file(temp_dir, args.count)
+        rows = parse_rows(file_path)
+        print(F'{"Backend":<28}{"Rows":>12}{"Seconds":>10}{"Rows/s":>12}')
+        for backend, seconds in benchmark(temp_dir, rows):
+            print(F'{backend:<28}{len(rows):>12}{seconds:>10.2f}'
+                  F'{len(rows) / seconds:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""Benchmark the PropertyFile parse modes in rows per second on one core.
+
+Run from the project root with the package on the path, e.g.
+    PYTHONPATH=oz_property_parser python scripts/benchmark_parse_modes.py
+    PYTHONPATH=oz_property_parser python scripts/benchmark_parse_modes.py \
+        path/to/001_SALES_DATA_NNME_15012018.DAT
+
+Without a file a synthetic new format weekly file is generated. With
+--memory the string memory shared by the STRING_POOL is reported as well.
+With --workers the rows the extractor writes are parsed in the calling
+process and in worker processes, the file is handed to the workers in parts
+the same way as by the extractor.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from typing import Callable, Deque, Iterator, List, Tuple
+
+import property_data_extractor
+import property_file_manager as prop_mgr
+import property_parser
+
+_SYNTHETIC_FILE_NAME = '001_SALES_DATA_NNME_15012018.DAT'
+_SYNTHETIC_LINES = [
+    'B;001;{id};141;20180115 01:15;;;73 A;KLINE ST;WESTON;2326;802.3;M;'
+    '20171121;20171219;515000;R2;R;RESIDENCE;;AAN;;0;AN8513;\n',
+    'C;001;{id};148;20180115 01:15;928/1209451;\n',
+    'D;001;{id};148;20180115 01:15;P;;;;;;\n',
+]
+
+BATCH_SIZE = 10000
+
+
+def write_synthetic_file(dir_path: str, property_count: int) -> str:
+    """Write a synthetic new format property file."""
+    file_path = os.path.join(dir_path, _SYNTHETIC_FILE_NAME)
+    with open(file_path, 'w', encoding='utf8') as prop_file:
+        prop_file.write('A;RTSALEDATA;001;20180115 01:15;VALNET;\n')
+        for idx in range(property_count):
+            for line in _SYNTHETIC_LINES:
+                prop_file.write(line.format(id=3000000 + idx))
+        prop_file.write(F'Z;{property_count};;;\n')
+    return file_path
+
+
+def _count_records(property_file: property_parser.PropertyFile) -> int:
+    return sum(1 for _ in property_file.iter_records())
+
+
+def _count_lazy_district(property_file: property_parser.PropertyFile) -> int:
+    district = property_parser.PropertyData.DISTRICT
+    return sum(1 for record in property_file.iter_records(lazy=True)
+               if record[district])
+
+
+def _count_column_batches(property_file: property_parser.PropertyFile) -> int:
+    return sum(len(batch)
+               for batch in property_file.iter_column_batches(BATCH_SIZE))
+
+
+ParseMode = Callable[[property_parser.PropertyFile], int]
+
+PARSE_MODES: List[Tuple[str, ParseMode]] = [
+    ('iter_records', _count_records),
+    ('iter_records lazy 1 field', _count_lazy_district),
+    ('iter_column_batches', _count_column_batches),
+]
+
+
+def benchmark(file_path: str) -> Iterator[Tuple[str, int, float]]:
+    """Run every parse mode over the file."""
+    property_class = prop_mgr.get_property_file_from_path(file_path)
+    for name, parse_mode in PARSE_MODES:
+        property_file = property_class(file_path)
+        start = time.perf_counter()
+        rows = parse_mode(property_file)
+        yield name, rows, time.perf_counter() - start
+
+
+def benchmark_workers(file_path: str,
+                      workers: int) -> Iterator[Tuple[str, int, float]]:
+    """Parse the file into rows in this process and in worker processes.
+
+    The worker processes are started before timing, parts are submitted
+    while a few of them are parsed ahead.
+    """
+    property_class = prop_mgr.get_property_file_from_path(file_path)
+    start = time.perf_counter()
+    rows = sum(len(batch) for batch in property_data_extractor
+               .iter_property_rows(property_class(file_path)))
+    yield 'iter_property_rows', rows, time.perf_counter() - start
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn')) as executor:
+        for _ in executor.map(abs, range(workers)):
+            pass
+
+        start = time.perf_counter()
+        rows = 0
+        pending: Deque['concurrent.futures.Future[List[object]]'] = (
+            collections.deque())
+        with open(file_path, 'rb') as prop_file:
+            for first_line_no, data in property_data_extractor \
+                    .iter_line_chunks(prop_file):
+                pending.append(executor.submit(
+                    property_data_extractor.parse_property_chunk,
+                    property_class, file_path, first_line_no, data))
+                if len(pending) > workers * 2:
+                    rows += len(pending.popleft().result())
+        rows += sum(len(future.result()) for future in pending)
+        yield (F'{workers} worker processes', rows,
+               time.perf_counter() - start)
+
+
+def string_pool_savings(file_path: str) -> Tuple[int, int]:
+    """Get the string bytes of the categorical fields with and without pool.
+
+    Without the pool every field value would be a string of its own, with
+    the pool each distinct string object is only counted once.
+    """
+    property_class = prop_mgr.get_property_file_from_path(file_path)
+    records = list(property_class(file_path).iter_records())
+
+    unshared_bytes = 0
+    shared_strings = {}
+    for record in records:
+        for field in property_parser.CATEGORICAL_FIELDS:
+            value = record[field]
+            unshared_bytes += sys.getsizeof(value)
+            shared_strings[id(value)] = sys.getsizeof(value)
+
+    return unshared_bytes, sum(shared_strings.values())
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', nargs='?', help='Property file to parse')
+    parser.add_argument('--count', type=int, default=200000,
+                        help='Properties in the synthetic file')
+    parser.add_argument('--memory', action='store_true',
+                        help='Report the memory saved by the string pool')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Also parse into rows in worker processes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = args.file or write_synthetic_file(temp_dir, args.count)
+        print(F'{"Mode":<28}{"Rows":>12}{"Seconds":>10}{"Rows/s":>12}')
+        results = list(benchmark(file_path))
+        if args.workers:
+            results += benchmark_workers(file_path, args.workers)
+        for name, rows, seconds in results:
+            print(F'{name:<28}{rows:>12}{seconds:>10.2f}'
+                  F'{rows / seconds:>12.0f}')
+
+        if args.memory:
+            unshared_bytes, shared_bytes = string_pool_savings(file_path)
+            print(F'Categorical strings without pool: {unshared_bytes:>14}')
+            print(F'Categorical strings with pool:    {shared_bytes:>14}')
+            print(F'Saved bytes:                      '
+                  F'{unshared_bytes - shared_bytes:>14}')
+
+
+if __name__ == '__main__':
+    main()
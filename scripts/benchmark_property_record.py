@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""Benchmark the Property record against the former defaultdict record.
+
+Run from the project root with the package on the path, e.g.
+    PYTHONPATH=oz_property_parser python scripts/benchmark_property_record.py
+"""
+
+import argparse
+import collections
+import gc
+import time
+import tracemalloc
+
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import property_parser
+
+# A representative parsed line, the values are shared between all records
+# the same way the field strings of a parsed file are distinct per line
+_SAMPLE_FIELDS = [
+    (property_parser.PropertyData.DISTRICT_CODE, '001'),
+    (property_parser.PropertyData.DISTRICT, 'CESSNOCK'),
+    (property_parser.PropertyData.PROPERTY_ID, '3771736'),
+    (property_parser.PropertyData.UNIT_NUMBER, ''),
+    (property_parser.PropertyData.HOUSE_NUMBER, '73 A'),
+    (property_parser.PropertyData.STREET_NAME, 'KLINE ST'),
+    (property_parser.PropertyData.SUBBURB, 'WESTON'),
+    (property_parser.PropertyData.POST_CODE, '2326'),
+    (property_parser.PropertyData.AREA, '802.3'),
+    (property_parser.PropertyData.AREA_TYPE, 'M'),
+    (property_parser.PropertyData.CONTRACT_DATE, '2017/11/21'),
+    (property_parser.PropertyData.SETTLEMENT_DATE, '2017/12/19'),
+    (property_parser.PropertyData.PURCHASE_PRICE, '515000'),
+    (property_parser.PropertyData.ZONE_CODE, 'R2'),
+    (property_parser.PropertyData.ZONE, 'Low Density Residential'),
+    (property_parser.PropertyData.ZONE_TYPE, 'Residential'),
+    (property_parser.PropertyData.NATURE_OF_PROPERTY, 'R'),
+    (property_parser.PropertyData.PRIMARY_PURPOSE, 'RESIDENCE'),
+    (property_parser.PropertyData.LOT_NUMBER, ''),
+    (property_parser.PropertyData.FILE_NAME, '001_SALES_DATA_NNME.DAT'),
+    (property_parser.PropertyData.LINE_NO, '2'),
+]
+
+
+class DictProperty():
+    """The former defaultdict based Property record, kept as baseline."""
+
+    def __init__(self, line: str) -> None:
+        """Initialize Property Line."""
+        self.line = line
+
+        self._fields: Dict[str, str] = collections.defaultdict(str)
+
+    def get_field_dic(self) -> Dict[str, str]:
+        """Get a list of all the fields as dictionaries."""
+        return self._fields
+
+    @staticmethod
+    def _keytransform(key: property_parser.PropertyData) -> str:
+        return str(key.value)
+
+    def __setitem__(self, key: property_parser.PropertyData,
+                    value: str) -> None:
+        self._fields[self._keytransform(key)] = value
+
+    def __getitem__(self, key: property_parser.PropertyData) -> str:
+        return self._fields[self._keytransform(key)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+
+RecordFactory = Callable[[str], object]
+
+_RECORD_CLASSES: List[Tuple[str, RecordFactory]] = [
+    ('defaultdict (baseline)', DictProperty),
+    ('slotted list', property_parser.Property),
+]
+
+
+def _fill(record_class: RecordFactory, line: str) -> object:
+    record = record_class(line)
+    for key, value in _SAMPLE_FIELDS:
+        record[key] = value  # type: ignore
+    return record
+
+
+def measure_bytes_per_record(record_class: RecordFactory, count: int) -> float:
+    """Measure the allocated bytes per filled record."""
+    gc.collect()
+    tracemalloc.start()
+    records = [_fill(record_class, 'line') for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current / count
+
+
+def measure_rows_per_second(record_class: RecordFactory, count: int) -> float:
+    """Measure filled and exported records per second."""
+    start = time.perf_counter()
+    for _ in range(count):
+        _fill(record_class, 'line').get_field_dic()  # type: ignore
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=200000,
+                        help='Number of records per measurement')
+    args = parser.parse_args()
+
+    print(F'{"Record":<24}{"Bytes/Record":>14}{"Rows/s":>14}')
+    for name, record_class in _RECORD_CLASSES:
+        bytes_per_record = measure_bytes_per_record(record_class, args.count)
+        rows_per_second = measure_rows_per_second(record_class, args.count)
+        print(F'{name:<24}{bytes_per_record:>14.1f}{rows_per_second:>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,8 @@
 #!/urs/bin/env python3
 
+import zipfile
+import zlib
+
 import pytest
 
 import archive_mgr
@@ -30,3 +33,55 @@ def test_file_is_archived(archive_name):
 def test_extract_invalid_archive():
     with pytest.raises(archive_mgr.ExtractionError):
         archive_mgr.extract(R'File.rar', R'fake_dest_dir')
+
+
+def test_open_invalid_archive():
+    with pytest.raises(archive_mgr.ExtractionError):
+        archive_mgr.open_archive(R'File.rar')
+
+
+def test_open_corrupt_archive(tmp_path):
+    file_path = tmp_path / 'Test.zip'
+    file_path.write_bytes(b'Not a Zip File')
+    with pytest.raises(archive_mgr.ExtractionError):
+        archive_mgr.open_archive(str(file_path))
+
+
+def _write_zip(file_path, members):
+    with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for name, data in members.items():
+            zip_ref.writestr(name, data)
+
+
+def test_open_archive_members(tmp_path):
+    file_path = tmp_path / 'Test.zip'
+    _write_zip(file_path, {'dir/': b'', 'dir/a.DAT': b'Content A',
+                           'b.DAT': b'Content B'})
+
+    with archive_mgr.open_archive(str(file_path)) as archive:
+        assert archive.member_names() == ['dir/a.DAT', 'b.DAT']
+
+        member = archive_mgr.ArchiveMember(archive, 'dir/a.DAT')
+        assert member.size() == 9
+        assert member.crc32() == zlib.crc32(b'Content A')
+        with member.open() as member_file:
+            assert member_file.read() == b'Content A'
+
+
+@pytest.mark.parametrize('spill_threshold', [0, 1024 * 1024])
+def test_open_nested_archive(tmp_path, spill_threshold):
+    inner_path = tmp_path / 'Inner.zip'
+    _write_zip(inner_path, {'a.DAT': b'Content A'})
+    outer_path = tmp_path / 'Outer.zip'
+    _write_zip(outer_path, {'Inner.zip': inner_path.read_bytes(),
+                            'Corrupt.zip': b'Not a Zip File'})
+
+    with archive_mgr.open_archive(str(outer_path)) as archive:
+        member = archive_mgr.ArchiveMember(archive, 'Inner.zip')
+        with member.open_archive(spill_threshold) as nested:
+            with nested.open_member('a.DAT') as member_file:
+                assert member_file.read() == b'Content A'
+
+        corrupt = archive_mgr.ArchiveMember(archive, 'Corrupt.zip')
+        with pytest.raises(archive_mgr.ExtractionError):
+            corrupt.open_archive(spill_threshold)
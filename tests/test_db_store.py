@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+
+import pytest
+import sqlalchemy
+
+from sqlalchemy.orm import sessionmaker
+
+import db_store
+
+
+@pytest.fixture
+def session():
+    engine = sqlalchemy.create_engine('sqlite://')
+    db_store.Base.metadata.create_all(
+        engine, tables=[db_store.ScannedFile.__table__])
+    db_session = sessionmaker(bind=engine)()
+    yield db_session
+    db_session.close()
+
+
+def _add_scanned_file(data_manager, size, checksum):
+    scanned_file = db_store.ScannedFile(
+        full_path=F'file_{size}', processed=False, size_bytes=size,
+        checksum=checksum)
+    data_manager.add_scanned_file(scanned_file)
+    return scanned_file
+
+
+def test_scanned_file_index():
+    indexes = {index.name: index
+               for index in db_store.ScannedFile.__table__.indexes}
+
+    index = indexes['uix_scanned_file_size_checksum']
+    assert index.unique
+    assert [col.name for col in index.columns] == ['size_bytes', 'checksum']
+
+
+def test_scanned_file_key_unique(session):
+    data_manager = db_store.DataManager(session)
+    _add_scanned_file(data_manager, 100, '12345')
+    _add_scanned_file(data_manager, 100, '12345')
+
+    with pytest.raises(sqlalchemy.exc.IntegrityError):
+        data_manager.commit()
+
+
+@pytest.mark.parametrize('preload', [False, True])
+def test_find_scanned_file(session, preload):
+    data_manager = db_store.DataManager(session)
+    scanned_file = _add_scanned_file(data_manager, 100, '12345')
+    if preload:
+        data_manager.preload_scanned_files()
+
+    assert data_manager.find_scanned_file(100, '12345') is scanned_file
+    assert data_manager.find_scanned_file(100, '54321') is None
+    assert data_manager.find_scanned_file(200, '12345') is None
+
+    new_file = _add_scanned_file(data_manager, 200, '12345')
+    assert data_manager.find_scanned_file(200, '12345') is new_file
+
+
+def test_add_scanned_files_on_commit(session):
+    session.add(db_store.ScannedFile(
+        id=7, full_path='old', processed=False, size_bytes=1, checksum='1'))
+    session.commit()
+    data_manager = db_store.DataManager(session)
+    old_file = data_manager.find_scanned_file(1, '1')
+    new_files = [_add_scanned_file(data_manager, size, '12345')
+                 for size in (100, 200, 300)]
+
+    assert [scanned_file.id for scanned_file in new_files] == [8, 9, 10]
+    assert session.query(db_store.ScannedFile).count() == 1
+
+    data_manager.set_processed(old_file)
+    data_manager.set_processed(new_files[1])
+    assert old_file.processed and new_files[1].processed
+    assert not session.dirty
+    data_manager.commit()
+
+    assert session.query(
+        db_store.ScannedFile.id, db_store.ScannedFile.processed).order_by(
+            db_store.ScannedFile.id).all() == [
+                (7, True), (8, False), (9, True), (10, False)]
+    assert data_manager.find_scanned_file(200, '12345').processed
+
+
+def test_create_missing_indexes():
+    engine = sqlalchemy.create_engine('sqlite://')
+    engine.execute('CREATE TABLE scanned_file (id INTEGER PRIMARY KEY, '
+                   'full_path VARCHAR, processed BOOLEAN, '
+                   'size_bytes VARCHAR, checksum VARCHAR, '
+                   'extracted_from_id INTEGER)')
+
+    db_store.create_missing_indexes(engine, db_store.ScannedFile.__table__)
+    db_store.create_missing_indexes(engine, db_store.ScannedFile.__table__)
+
+    index_names = [index['name'] for index in
+                   sqlalchemy.inspect(engine).get_indexes('scanned_file')]
+    assert index_names == ['uix_scanned_file_size_checksum']
+
+
+@pytest.mark.parametrize('backend', db_store.INSERT_BACKENDS)
+def test_add_property_rows(tmp_path, backend):
+    with db_store.SqliteDb(str(tmp_path / 'test.sql')) as database:
+        database.create(['File_Name', 'Price', 'Area'])
+        sales_data = database.sales_data
+        columns = sales_data.columns
+        rows = [tuple(F'{col}_{idx}' if col != 'Area' else None
+                      for col in columns) for idx in range(3)]
+
+        with database.session_scope() as db_session:
+            with db_store.DataManager(db_session, 2, backend,
+                                      sales_data) as data_manager:
+                data_manager.add_property_rows(rows)
+                data_manager.add_property_rows(rows[:1])
+
+        with database.session_scope() as db_session:
+            stored_rows = db_session.execute(sqlalchemy.select(
+                [sales_data.table.c[col] for col in columns]).order_by(
+                    sales_data.table.c.id)).fetchall()
+
+    assert stored_rows == rows + rows[:1]
+
+
+def test_ingest_checkpoints(tmp_path):
+    with db_store.SqliteDb(str(tmp_path / 'test.sql')) as database:
+        database.create(['File_Name', 'Price', 'Area'])
+        columns = database.sales_data.columns
+        rows = [tuple(F'{col}_{idx}' for col in columns) for idx in range(5)]
+
+        with database.session_scope() as db_session:
+            with db_store.DataManager(db_session, 2, sales_data=(
+                    database.sales_data)) as data_manager:
+                done_file = _add_scanned_file(data_manager, 100, '12345')
+                open_file = _add_scanned_file(data_manager, 200, '12345')
+                data_manager.add_property_rows(rows[:1], done_file.id)
+                data_manager.add_property_rows(rows[1:3], open_file.id)
+                data_manager.add_property_rows(rows[3:4], done_file.id)
+                data_manager.set_processed(done_file)
+                data_manager.add_property_rows(rows[4:], open_file.id)
+
+        with database.session_scope() as db_session:
+            data_manager = db_store.DataManager(db_session)
+            checkpoints = db_session.query(
+                db_store.IngestCheckpoint.scanned_file_id,
+                db_store.IngestCheckpoint.rows_committed).order_by(
+                    db_store.IngestCheckpoint.scanned_file_id).all()
+
+            assert checkpoints == [(done_file.id, 2), (open_file.id, 3)]
+            assert data_manager.find_checkpoint(open_file.id) == 3
+            assert data_manager.find_checkpoint(done_file.id) == 0
+
+
+def test_unknown_insert_backend(session):
+    with pytest.raises(ValueError):
+        db_store.DataManager(session, backend='csv')
+
+
+def test_add_property_rows_without_store(session):
+    data_manager = db_store.DataManager(session)
+
+    with pytest.raises(ValueError):
+        data_manager.add_property_rows([('001',)])
+
+
+def test_create_per_database(tmp_path):
+    with db_store.SqliteDb(str(tmp_path / 'typed.sql')) as database:
+        database.create(['Property_ID', 'Price'], {'Price': int},
+                        natural_key=['Property_ID'])
+        typed = database.sales_data
+    with db_store.SqliteDb(str(tmp_path / 'untyped.sql')) as database:
+        database.create(['Property_ID', 'Price', 'Area'])
+        untyped = database.sales_data
+
+    assert typed.column_types() == {'Property_ID': str, 'Price': int}
+    assert untyped.column_types() == {
+        'Property_ID': str, 'Price': str, 'Area': str}
+    assert [index.name for index in typed.table.indexes] == [
+        'uix_sales_data_natural_key']
+    assert not untyped.table.indexes
+
+
+def test_bulk_load(tmp_path):
+    def pragma(database, name):
+        with database.session_scope() as db_session:
+            return db_session.execute(F'pragma {name}').scalar()
+
+    with db_store.SqliteDb(str(tmp_path / 'test.sql')) as database:
+        metadata = sqlalchemy.MetaData()
+        table = sqlalchemy.Table(
+            'bulk', metadata,
+            sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.Column('value', sqlalchemy.Integer, index=True))
+        metadata.create_all(database._engine)
+        assert pragma(database, 'journal_mode') == 'delete'
+
+        with database.bulk_load():
+            assert pragma(database, 'journal_mode') == 'wal'
+            assert pragma(database, 'synchronous') == 1
+            with database.session_scope() as db_session:
+                db_session.execute(table.insert(),
+                                   [{'value': idx} for idx in range(10)])
+
+        assert pragma(database, 'journal_mode') == 'wal'
+        assert pragma(database, 'synchronous') == 2
+        with database.session_scope() as db_session:
+            assert db_session.execute(
+                'SELECT count(*) FROM sqlite_stat1').scalar() > 0
+
+
+def test_existing_column_types(tmp_path):
+    with db_store.SqliteDb(str(tmp_path / 'test.sql')) as database:
+        assert database.existing_column_types('typed') == {}
+
+        database._engine.execute(
+            'CREATE TABLE typed (id INTEGER PRIMARY KEY, '
+            'price INTEGER, area FLOAT, name VARCHAR(255))')
+        column_types = database.existing_column_types('typed')
+
+    assert {col: col_type.python_type for col, col_type in
+            column_types.items()} == {
+                'id': int, 'price': int, 'area': float, 'name': str}
+
+
+@pytest.mark.parametrize('backend', db_store.INSERT_BACKENDS)
+def test_normalized_sales_data(backend):
+    sales_table = sqlalchemy.Table(
+        'flat', sqlalchemy.MetaData(),
+        sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+        sqlalchemy.Column('District_Code', sqlalchemy.Unicode(255)),
+        sqlalchemy.Column('District', sqlalchemy.Unicode(255)),
+        sqlalchemy.Column('Price', sqlalchemy.Integer),
+        sqlalchemy.Column('Subburb', sqlalchemy.Unicode(255)))
+    normalized = db_store.NormalizedSalesData(sales_table, [
+        db_store.Dimension('district', ['District_Code', 'District'],
+                           [('001', 'CESSNOCK')]),
+        db_store.Dimension('suburb', ['Subburb'])])
+    rows = [
+        ('001', 'CESSNOCK', 100, 'WESTON'),
+        ('002', 'DUNGOG', 200, 'WESTON'),
+        ('001', 'CESSNOCK', None, None),
+    ]
+
+    engine = sqlalchemy.create_engine('sqlite://')
+    normalized.create(engine)
+    normalized.create(engine)
+    db_session = sessionmaker(bind=engine)()
+    normalized.insert_rows(db_session, rows, backend)
+    db_session.commit()
+
+    assert engine.execute(
+        'SELECT District_Code, District, Price, Subburb FROM SalesData '
+        'ORDER BY id').fetchall() == rows
+    assert engine.execute('SELECT * FROM district').fetchall() == [
+        (1, '001', 'CESSNOCK'), (2, '002', 'DUNGOG')]
+    assert engine.execute('SELECT * FROM suburb').fetchall() == [
+        (1, 'WESTON')]
+    assert engine.execute(
+        'SELECT district_id, suburb_id, Price FROM sales_fact').fetchall() == [
+            (1, 1, 100), (2, 1, 200), (1, None, None)]
+    db_session.close()
+
+
+def _sales_store(normalized):
+    metadata = sqlalchemy.MetaData()
+    sales_table = sqlalchemy.Table(
+        'flat', metadata,
+        sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+        sqlalchemy.Column('Property_ID', sqlalchemy.Unicode(255)),
+        sqlalchemy.Column('District_Code', sqlalchemy.Unicode(255)),
+        sqlalchemy.Column('Price', sqlalchemy.Integer),
+        sqlalchemy.Column('File_Name', sqlalchemy.Unicode(255)),
+        sqlalchemy.Column(db_store.CONTENT_HASH_COLUMN, sqlalchemy.Integer))
+    natural_key = ['Property_ID', 'District_Code']
+    if normalized:
+        return 'SalesData', db_store.NormalizedSalesData(
+            sales_table, [db_store.Dimension('district', ['District_Code'])],
+            natural_key, ['File_Name'])
+
+    sqlalchemy.Index('uix_flat_natural_key', sales_table.c.Property_ID,
+                     sales_table.c.District_Code, unique=True)
+    return 'flat', db_store.SalesDataStore(
+        sales_table, db_store.row_columns(sales_table), natural_key,
+        ['File_Name'])
+
+
+SALES_STORE_UPSERT = [
+    (False, db_store.InsertCounts(1, 0, 2),
+     [('1', '001', 100, 'weekly'), ('2', '001', 200, 'weekly'),
+      ('1', '002', 100, 'yearly')]),
+    (True, db_store.InsertCounts(1, 1, 1),
+     [('1', '001', 100, 'weekly'), ('2', '001', 250, 'yearly'),
+      ('1', '002', 100, 'yearly')]),
+]
+@pytest.mark.parametrize('normalized', [False, True])
+@pytest.mark.parametrize('backend', db_store.INSERT_BACKENDS)
+@pytest.mark.parametrize('upsert, expected_counts, expected_rows',
+                         SALES_STORE_UPSERT)
+def test_sales_store_natural_key(normalized, backend, upsert,
+                                 expected_counts, expected_rows):
+    view_name, store = _sales_store(normalized)
+    engine = sqlalchemy.create_engine('sqlite://')
+    if normalized:
+        store.create(engine)
+    else:
+        store.table.metadata.create_all(engine)
+    db_session = sessionmaker(bind=engine)()
+
+    assert store.insert_rows(db_session, [
+        ('1', '001', 100, 'weekly'), ('2', '001', 200, 'weekly')],
+                             backend, upsert) == (2, 0, 0)
+    assert store.insert_rows(db_session, [
+        ('1', '001', 100, 'yearly'), ('2', '001', 250, 'yearly'),
+        ('1', '002', 100, 'yearly')], backend, upsert) == expected_counts
+    db_session.commit()
+
+    assert engine.execute(
+        F'SELECT Property_ID, District_Code, Price, File_Name '
+        F'FROM {view_name} ORDER BY id').fetchall() == expected_rows
+    db_session.close()
+
+
+def test_content_hash():
+    _, store = _sales_store(False)
+
+    assert (store.content_hash(('1', '001', 100, 'weekly')) ==
+            store.content_hash(('2', '002', 100, 'yearly')))
+    assert (store.content_hash(('1', '001', 100, 'weekly')) !=
+            store.content_hash(('1', '001', 101, 'weekly')))
+
+
+def test_add_missing_columns():
+    engine = sqlalchemy.create_engine('sqlite://')
+    engine.execute('CREATE TABLE flat (id INTEGER PRIMARY KEY, '
+                   'Property_ID VARCHAR)')
+    _, store = _sales_store(False)
+
+    db_store.add_missing_columns(engine, store.table)
+
+    assert [col['name'] for col in sqlalchemy.inspect(engine).get_columns(
+        'flat')] == ['id', 'Property_ID', 'District_Code', 'Price',
+                     'File_Name', db_store.CONTENT_HASH_COLUMN]
+
+
+COMMIT_DUE = [
+    (False, 99, 10 ** 6, 0),
+    (True, 100, 0, 0),
+    (False, 99, 999, 1000),
+    (True, 1, 1000, 1000),
+]
+@pytest.mark.parametrize('expected_due, rows, buffered_bytes, memory_budget',
+                         COMMIT_DUE)
+def test_commit_policy_due(expected_due, rows, buffered_bytes, memory_budget):
+    policy = db_store.CommitPolicy(100, memory_budget)
+
+    assert policy.commit_due(rows, buffered_bytes) == expected_due
+
+
+COMMIT_ADAPT = [
+    (100000, 100000, 0, 10000, 1.0),
+    (55000, 100000, 1.0, 10000, 1.0),
+    (100000, 100000, 1.0, 10 ** 6, 1.0),
+    (db_store.CommitPolicy.MIN_COMMIT_ROWS, 1500, 1.0, 1, 1.0),
+]
+@pytest.mark.parametrize(
+    'expected_rows, commit_max, target_seconds, rows, seconds', COMMIT_ADAPT)
+def test_commit_policy_adapt(expected_rows, commit_max, target_seconds, rows,
+                             seconds):
+    policy = db_store.CommitPolicy(commit_max, 0, target_seconds)
+    policy.committed(rows, 0, seconds)
+
+    assert policy.commit_rows == expected_rows
+
+
+def test_estimate_row_bytes():
+    row = ('CESSNOCK', None, 12)
+
+    assert db_store.estimate_row_bytes(row) > len('CESSNOCK')
+    assert (db_store.estimate_row_bytes({'District': 'CESSNOCK'}) >
+            len('CESSNOCK'))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import hashlib
+import io
+import zipfile
+import zlib
+
+import pytest
+
+import archive_mgr
+import fingerprint
+
+CONTENT = b'B;001;3771736;141;20180115 01:15;;;73 A;KLINE ST;WESTON;\n' * 100
+
+CHECKSUMS = [
+    (fingerprint.ADLER32, str(zlib.adler32(CONTENT))),
+    (fingerprint.CRC32, F'crc32:{zlib.crc32(CONTENT):08x}'),
+    (fingerprint.BLAKE2B,
+     'blake2b:' + hashlib.blake2b(CONTENT, digest_size=32).hexdigest()),
+]
+@pytest.mark.parametrize('engine_name, expected_checksum', CHECKSUMS)
+def test_checksum_stream(engine_name, expected_checksum):
+    checksum = fingerprint.checksum_stream(io.BytesIO(CONTENT), engine_name)
+
+    assert checksum == expected_checksum
+    assert fingerprint.engine_of_checksum(checksum) == engine_name
+
+
+@pytest.mark.parametrize('engine_name, expected_checksum', CHECKSUMS)
+def test_fingerprint_file_and_member(tmp_path, engine_name,
+                                     expected_checksum):
+    file_path = tmp_path / '001_SALES_DATA_NNME_15012018.DAT'
+    file_path.write_bytes(CONTENT)
+    zip_path = tmp_path / 'Test.zip'
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.write(file_path, 'member.DAT')
+
+    assert (fingerprint.fingerprint_file(str(file_path), engine_name) ==
+            (len(CONTENT), expected_checksum))
+    with archive_mgr.open_archive(str(zip_path)) as archive:
+        member = archive_mgr.ArchiveMember(archive, 'member.DAT')
+        assert (fingerprint.fingerprint_member(member, engine_name) ==
+                (len(CONTENT), expected_checksum))
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        fingerprint.get_engine('md5')
+
+
+ENGINE_OF_CHECKSUM = [
+    (fingerprint.ADLER32, '2412724862'),
+    (fingerprint.CRC32, 'crc32:62fcee4f'),
+    (fingerprint.BLAKE2B, 'blake2b:8bd4a43f'),
+    (fingerprint.ADLER32, 'md5:8bd4a43f'),
+]
+@pytest.mark.parametrize('expected_engine, checksum', ENGINE_OF_CHECKSUM)
+def test_engine_of_checksum(expected_engine, checksum):
+    assert fingerprint.engine_of_checksum(checksum) == expected_engine
+
+
+def test_rehash_stream():
+    old_checksum = str(zlib.adler32(CONTENT))
+
+    assert (fingerprint.rehash_stream(io.BytesIO(CONTENT), old_checksum,
+                                      fingerprint.CRC32) ==
+            F'crc32:{zlib.crc32(CONTENT):08x}')
+    assert fingerprint.rehash_stream(io.BytesIO(CONTENT + b'Changed'),
+                                     old_checksum, fingerprint.CRC32) is None
+
+
+def test_rehash_files(tmp_path):
+    file_path = tmp_path / 'file.DAT'
+    file_path.write_bytes(CONTENT)
+    old_checksums = [
+        (str(file_path), str(zlib.adler32(CONTENT))),
+        (str(file_path), str(zlib.adler32(CONTENT + b'Revised'))),
+        (str(tmp_path / 'missing.DAT'), str(zlib.adler32(CONTENT))),
+    ]
+
+    checksums = fingerprint.rehash_files(old_checksums, fingerprint.BLAKE2B, 2)
+
+    assert checksums == {
+        old_checksums[0]: CHECKSUMS[2][1],
+        old_checksums[1]: None,
+        old_checksums[2]: None,
+    }
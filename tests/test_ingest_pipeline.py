@@ -0,0 +1,85 @@
+#!/urs/bin/env python3
+
+import threading
+
+import pytest
+
+import ingest_pipeline
+
+
+def test_stage_handles_all_items():
+    handled = []
+    lock = threading.Lock()
+
+    def handler(item):
+        with lock:
+            handled.append(item)
+
+    stage = ingest_pipeline.Stage('test', handler, None, workers=3)
+    stage.start()
+    for item in range(100):
+        stage.put(item)
+    stage.stop()
+
+    assert sorted(handled) == list(range(100))
+    assert stage.depth() == 0
+
+
+def test_stage_reports_errors():
+    errors = []
+
+    def handler(item):
+        if item == 2:
+            raise ValueError('Invalid Item')
+
+    stage = ingest_pipeline.Stage(
+        'test', handler, lambda item, error: errors.append((item, error)))
+    stage.start()
+    for item in range(4):
+        stage.put(item)
+    stage.stop()
+
+    assert len(errors) == 1
+    assert errors[0][0] == 2
+    assert isinstance(errors[0][1], ValueError)
+
+
+def test_stage_bounded_queue_depth():
+    release = threading.Event()
+    stage = ingest_pipeline.Stage(
+        'test', lambda item: release.wait(), None, maxsize=2)
+
+    # Not started, so the queued items are not handled
+    stage.put(1)
+    stage.put(2)
+    assert stage.depth() == 2
+    assert stage.max_depth == 2
+
+    release.set()
+    stage.start()
+    stage.stop()
+    assert stage.depth() == 0
+
+
+def test_stage_no_workers():
+    with pytest.raises(ValueError):
+        ingest_pipeline.Stage('test', print, None, workers=0)
+
+
+FORMAT_DEPTHS = [
+    ('a 1/4, b 2', {'a': 1, 'b': 2}, {'a': 4, 'b': 0}),
+    ('a 0', {'a': 0}, {}),
+    ('', {}, {}),
+]
+@pytest.mark.parametrize('expected_str, depths, maxsizes', FORMAT_DEPTHS)
+def test_format_depths(expected_str, depths, maxsizes):
+    assert ingest_pipeline.format_depths(depths, maxsizes) == expected_str
+
+
+def test_queue_monitor_depths():
+    monitor = ingest_pipeline.QueueMonitor(
+        {'a': lambda: 3, 'b': lambda: 0}, {}, 0)
+    monitor.start()
+    monitor.stop()
+
+    assert monitor.depths() == {'a': 3, 'b': 0}
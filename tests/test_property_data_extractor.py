@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import io
+import os
+import sqlite3
+import zipfile
+import zlib
+
+import pytest
+import sqlalchemy
+
+from sqlalchemy.orm import sessionmaker
+
+import archive_mgr
+import db_store
+import fingerprint
+import property_data_extractor
+import property_parser
+import property_parser_nsw
+
+CONTENT = b'B;001;3771736;141;20180115 01:15;;;73 A;KLINE ST;WESTON;\n' * 100
+
+
+@pytest.fixture
+def session():
+    engine = sqlalchemy.create_engine('sqlite://')
+    db_store.Base.metadata.create_all(
+        engine, tables=[db_store.ScannedFile.__table__])
+    db_session = sessionmaker(bind=engine)()
+    yield db_session
+    db_session.close()
+
+
+def test_migrate_fingerprints_revised_file(tmp_path, session):
+    # The file was registered, revised in place with the same size and
+    # registered again, only the last content is still on disk
+    file_path = tmp_path / '001_SALES_DATA_NNME_15012018.DAT'
+    old_content = CONTENT.replace(b'WESTON', b'EASTON')
+    file_path.write_bytes(CONTENT)
+    for file_id, content in [(1, old_content), (2, CONTENT)]:
+        session.add(db_store.ScannedFile(
+            id=file_id, full_path=str(file_path), processed=True,
+            size_bytes=len(content), checksum=str(zlib.adler32(content))))
+    session.commit()
+
+    data_manager = db_store.DataManager(session)
+    property_data_extractor.migrate_fingerprints(
+        data_manager, fingerprint.BLAKE2B, 2, 0)
+    data_manager.commit()
+
+    checksums = dict(session.query(
+        db_store.ScannedFile.id, db_store.ScannedFile.checksum))
+    assert checksums == {
+        1: str(zlib.adler32(old_content)),
+        2: fingerprint.fingerprint_file(str(file_path), fingerprint.BLAKE2B)[1],
+    }
+
+
+def test_migrate_fingerprints_registered_twice(tmp_path, session):
+    # The content was registered again with the new engine before migrating
+    file_path = tmp_path / '001_SALES_DATA_NNME_15012018.DAT'
+    file_path.write_bytes(CONTENT)
+    size, new_checksum = fingerprint.fingerprint_file(
+        str(file_path), fingerprint.BLAKE2B)
+    for file_id, checksum in [(1, str(zlib.adler32(CONTENT))),
+                              (2, new_checksum)]:
+        session.add(db_store.ScannedFile(
+            id=file_id, full_path=str(file_path), processed=True,
+            size_bytes=size, checksum=checksum))
+    session.commit()
+
+    data_manager = db_store.DataManager(session)
+    property_data_extractor.migrate_fingerprints(
+        data_manager, fingerprint.BLAKE2B, 2, 0)
+    data_manager.commit()
+
+    checksums = dict(session.query(
+        db_store.ScannedFile.id, db_store.ScannedFile.checksum))
+    assert checksums == {1: str(zlib.adler32(CONTENT)), 2: new_checksum}
+
+
+LINE_CHUNKS = [
+    (b'', 4, []),
+    (b'a\nbb\nccc\n', 5, [(1, b'a\nbb\n'), (3, b'ccc\n')]),
+    (b'a\nbb\nccc\n', 2, [(1, b'a\n'), (2, b'bb\n'), (3, b'ccc\n')]),
+    (b'a\nbb\nccc', 3, [(1, b'a\n'), (2, b'bb\n'), (3, b'ccc')]),
+    (b'abcdefg\nh\n', 2, [(1, b'abcdefg\n'), (2, b'h\n')]),
+    (b'a\r\nb\r\n', 100, [(1, b'a\r\nb\r\n')]),
+]
+@pytest.mark.parametrize('data,chunk_bytes,expected', LINE_CHUNKS)
+def test_iter_line_chunks(data, chunk_bytes, expected):
+    chunks = property_data_extractor.iter_line_chunks(
+        io.BytesIO(data), chunk_bytes)
+
+    assert list(chunks) == expected
+
+
+def _new_file_content(first_id, count):
+    return (
+        b'A;RTSALEDATA;001;20180115 01:15;VALNET;\n' +
+        b''.join(
+            b'B;001;%d;141;20180115 01:15;;;73 A;KLINE ST;WESTON;2326;802.3;'
+            b'M;20171121;20171219;515000;R2;R;RESIDENCE;;AAN;;0;AN8513;\n'
+            b'C;001;%d;148;20180115 01:15;928/1209451;\n' % (idx, idx)
+            for idx in range(first_id, first_id + count)) +
+        b'Z;%d;148;148;434;\n' % count)
+
+
+NEW_FILE_CONTENT = _new_file_content(0, 20)
+
+
+@pytest.mark.parametrize('chunk_bytes', [1, 100, 1000, 10 ** 6])
+def test_parse_property_chunk(chunk_bytes):
+    file_path = '001_SALES_DATA_NNME_15012018.DAT'
+    property_class = property_parser_nsw.NswNewPropertyFile
+    expected = [
+        row for rows in property_data_extractor.iter_property_rows(
+            property_class(file_path,
+                           lambda: io.BytesIO(NEW_FILE_CONTENT)))
+        for row in rows]
+
+    chunks = property_data_extractor.iter_line_chunks(
+        io.BytesIO(NEW_FILE_CONTENT), chunk_bytes)
+    rows = [
+        row for first_line_no, data in chunks
+        for row in property_data_extractor.parse_property_chunk(
+            property_class, file_path, first_line_no, data)]
+
+    assert len(rows) == 20
+    assert rows == expected
+
+
+def _parse_tree(db_path, tree_path, settings, batch_size=3, commit_max=10000,
+                executor=None):
+    with db_store.SqliteDb(str(db_path)) as database:
+        database.create(
+            [str(fld.value) for fld in property_parser.PropertyData],
+            natural_key=[str(fld.value) for fld in
+                         property_data_extractor.SALES_NATURAL_KEY],
+            source_columns=[str(fld.value) for fld in
+                            property_data_extractor.SALES_SOURCE_FIELDS])
+        with database.session_scope() as db_session:
+            with db_store.DataManager(
+                    db_session, commit_max, sales_data=database.sales_data
+            ) as data_manager:
+                if executor is None:
+                    property_data_extractor.parse_path(
+                        data_manager, str(tree_path), batch_size=batch_size,
+                        settings=settings)
+                else:
+                    pipeline = property_data_extractor.ParsePipeline(
+                        settings, batch_size, executor)
+                    pipeline.run(data_manager, str(tree_path))
+
+
+def _query(db_path, statement):
+    with sqlite3.connect(str(db_path)) as connection:
+        return connection.execute(statement).fetchall()
+
+
+def _sales_rows(db_path):
+    return _query(db_path, 'SELECT File_Name, Line_No, Property_ID '
+                           'FROM SalesData ORDER BY id')
+
+
+def _scanned_files(db_path):
+    return _query(db_path, 'SELECT id, full_path, processed, checksum, '
+                           'extracted_from_id FROM scanned_file ORDER BY id')
+
+
+def _write_zip(zip_path, members):
+    with zipfile.ZipFile(str(zip_path), 'w') as zip_file:
+        for name, content in members.items():
+            zip_file.writestr(name, content)
+
+
+SETTINGS = property_data_extractor.PipelineSettings(queue_log_interval=0)
+
+
+def test_parse_workers(tmp_path, monkeypatch):
+    tree_path = tmp_path / 'tree'
+    tree_path.mkdir()
+    (tree_path / '001_SALES_DATA_NNME_15012018.DAT').write_bytes(
+        NEW_FILE_CONTENT)
+    monkeypatch.setattr(property_data_extractor, 'PARSE_CHUNK_BYTES', 300)
+
+    _parse_tree(tmp_path / 'serial.sql', tree_path, SETTINGS)
+    with concurrent.futures.ThreadPoolExecutor(2) as executor:
+        _parse_tree(tmp_path / 'workers.sql', tree_path, SETTINGS,
+                    executor=executor)
+
+    rows = _sales_rows(tmp_path / 'workers.sql')
+    assert len(rows) == 20
+    assert rows == _sales_rows(tmp_path / 'serial.sql')
+
+
+def test_parse_path_rerun(tmp_path, monkeypatch):
+    tree_path = tmp_path / 'tree'
+    tree_path.mkdir()
+    (tree_path / '001_SALES_DATA_NNME_15012018.DAT').write_bytes(
+        _new_file_content(0, 5))
+    (tree_path / '001_SALES_DATA_NNME_22012018.DAT').write_bytes(
+        _new_file_content(5, 5))
+    _write_zip(tree_path / '001.zip', {
+        '001_SALES_DATA_NNME_29012018.DAT': _new_file_content(10, 5)})
+    db_path = tmp_path / 'test.sql'
+
+    _parse_tree(db_path, tree_path, SETTINGS)
+    rows = _sales_rows(db_path)
+    scanned_files = _scanned_files(db_path)
+    assert len(rows) == 15
+    assert [processed for _, _, processed, _, _ in scanned_files] == [1] * 4
+
+    # Unchanged files are neither fingerprinted nor parsed again
+    def fingerprint_file(file_path, engine_name):
+        raise AssertionError(F'Fingerprinted "{file_path}" again')
+    monkeypatch.setattr(fingerprint, 'fingerprint_file', fingerprint_file)
+    monkeypatch.setattr(archive_mgr, 'extract', fingerprint_file)
+
+    _parse_tree(db_path, tree_path, SETTINGS)
+    assert _sales_rows(db_path) == rows
+    assert _scanned_files(db_path) == scanned_files
+
+
+ARCHIVE_SETTINGS = [
+    (False, fingerprint.BLAKE2B),
+    (True, fingerprint.BLAKE2B),
+    (True, fingerprint.CRC32),
+]
+@pytest.mark.parametrize('stream_archives,engine_name', ARCHIVE_SETTINGS)
+def test_parse_path_archives(tmp_path, stream_archives, engine_name):
+    tree_path = tmp_path / 'tree'
+    tree_path.mkdir()
+    _write_zip(tmp_path / 'inner.zip', {
+        '001_SALES_DATA_NNME_22012018.DAT': _new_file_content(5, 5)})
+    _write_zip(tree_path / 'outer.zip', {
+        '001_SALES_DATA_NNME_15012018.DAT': _new_file_content(0, 5),
+        'inner.zip': (tmp_path / 'inner.zip').read_bytes(),
+        'readme.txt': b'Not parsed'})
+    db_path = tmp_path / 'test.sql'
+    settings = SETTINGS._replace(stream_archives=stream_archives,
+                                 fingerprint=engine_name)
+
+    _parse_tree(db_path, tree_path, settings)
+
+    rows = _sales_rows(db_path)
+    assert sorted(rows) == sorted(
+        [('001_SALES_DATA_NNME_15012018.DAT', str(line_no), str(idx))
+         for idx, line_no in zip(range(0, 5), range(2, 12, 2))] +
+        [('001_SALES_DATA_NNME_22012018.DAT', str(line_no), str(idx))
+         for idx, line_no in zip(range(5, 10), range(2, 12, 2))])
+
+    # The extraction dirs are removed, the streamed members keep their path
+    # inside the archive
+    assert [path.name for path in tree_path.iterdir()] == ['outer.zip']
+    outer_dir = str(tree_path / ('outer.zip' if stream_archives else
+                                 'EXTRACT_outer.zip'))
+    inner_dir = os.path.join(
+        outer_dir, 'inner.zip' if stream_archives else 'EXTRACT_inner.zip')
+    scanned_files = {
+        full_path: (file_id, processed, checksum, extracted_from_id)
+        for file_id, full_path, processed, checksum, extracted_from_id
+        in _scanned_files(db_path)}
+    outer_id = scanned_files[str(tree_path / 'outer.zip')][0]
+    inner_id = scanned_files[os.path.join(outer_dir, 'inner.zip')][0]
+    assert {full_path: (processed, extracted_from_id)
+            for full_path, (_, processed, _, extracted_from_id)
+            in scanned_files.items()} == {
+        str(tree_path / 'outer.zip'): (1, None),
+        os.path.join(outer_dir, '001_SALES_DATA_NNME_15012018.DAT'):
+            (1, outer_id),
+        os.path.join(outer_dir, 'inner.zip'): (1, outer_id),
+        os.path.join(inner_dir, '001_SALES_DATA_NNME_22012018.DAT'):
+            (1, inner_id),
+    }
+    assert {fingerprint.engine_of_checksum(checksum)
+            for _, _, checksum, _ in scanned_files.values()} == {engine_name}
+
+
+def test_parse_path_duplicate_file(tmp_path, caplog):
+    tree_path = tmp_path / 'tree'
+    tree_path.mkdir()
+    for name in ['001_SALES_DATA_NNME_15012018.DAT',
+                 '002_SALES_DATA_NNME_15012018.DAT']:
+        (tree_path / name).write_bytes(NEW_FILE_CONTENT)
+    db_path = tmp_path / 'test.sql'
+
+    _parse_tree(db_path, tree_path, SETTINGS)
+
+    assert len(_sales_rows(db_path)) == 20
+    scanned_files = _scanned_files(db_path)
+    assert len(scanned_files) == 1
+    assert scanned_files[0][2] == 1
+
+    # Skipped as already queued or as processed, if finished before
+    assert 'Skipping' in caplog.text
+
+
+def test_parse_path_resume(tmp_path, monkeypatch, caplog):
+    tree_path = tmp_path / 'tree'
+    tree_path.mkdir()
+    (tree_path / '001_SALES_DATA_NNME_15012018.DAT').write_bytes(
+        NEW_FILE_CONTENT)
+    db_path = tmp_path / 'test.sql'
+
+    # The parse stage fails after 6 rows, the writer raises its error after
+    # committing the rows it got
+    iter_property_rows = property_data_extractor.iter_property_rows
+
+    def failing_property_rows(*args):
+        row_batches = iter_property_rows(*args)
+        yield next(row_batches)
+        yield next(row_batches)
+        raise OSError('Disk gone')
+    monkeypatch.setattr(property_data_extractor, 'iter_property_rows',
+                        failing_property_rows)
+
+    with pytest.raises(OSError, match='Disk gone'):
+        _parse_tree(db_path, tree_path, SETTINGS, commit_max=4)
+    assert len(_sales_rows(db_path)) == 6
+    assert _query(db_path, 'SELECT processed FROM scanned_file') == [(0,)]
+    assert _query(db_path, 'SELECT rows_committed FROM ingest_checkpoint'
+                  ) == [(6,)]
+
+    monkeypatch.undo()
+    _parse_tree(db_path, tree_path, SETTINGS, commit_max=4)
+
+    assert 'after 6 committed Properties' in caplog.text
+    assert [record.getMessage().rsplit(', ', 1)[1]
+            for record in caplog.records
+            if record.getMessage().startswith('Export complete')
+            ] == ['14 Properties']
+    rows = _sales_rows(db_path)
+    assert [int(property_id) for _, _, property_id in rows] == list(
+        range(20))
+    assert _query(db_path, 'SELECT processed FROM scanned_file') == [(1,)]
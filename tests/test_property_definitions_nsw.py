@@ -332,3 +332,13 @@ ZONE_TYPE_NEW_FAILED = [
 @pytest.mark.parametrize('zone_code, expected_zone_type', ZONE_TYPE_NEW_FAILED)
 def test_get_type_from_new_zone_code_failed(zone_code, expected_zone_type):
     assert property_definitions_nsw.get_type_from_new_zone_code(zone_code) == expected_zone_type
+
+
+def test_get_codes():
+    district_codes = property_definitions_nsw.get_district_codes()
+    old_zone_codes = property_definitions_nsw.get_old_zone_codes()
+    new_zone_codes = property_definitions_nsw.get_new_zone_codes()
+
+    assert district_codes['001'] == 'CESSNOCK'
+    assert old_zone_codes['A'] == 'Residential'
+    assert new_zone_codes['R2'] == ('Low Density Residential', 'Residential')
@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
 
+import array
+import datetime
+import math
+
 import pytest
 
 import property_parser
@@ -24,12 +28,67 @@ def test_property_init():
         assert prop[field] == ''
 
 
+def test_property_mapping():
+    prop = property_parser.Property('This is a fake line')
+    prop[property_parser.PropertyData.DISTRICT] = 'SYDNEY'
+    prop[property_parser.PropertyData.AREA] = ''
+
+    assert prop[property_parser.PropertyData.DISTRICT] == 'SYDNEY'
+    assert len(prop) == 2
+    assert list(prop) == ['Area', 'District']
+    assert prop.get_field_dic() == {'Area': '', 'District': 'SYDNEY'}
+
+    del prop[property_parser.PropertyData.AREA]
+    assert len(prop) == 1
+    assert prop.get_field_dic() == {'District': 'SYDNEY'}
+    with pytest.raises(KeyError):
+        del prop[property_parser.PropertyData.AREA]
+
+
+def test_property_field_tuple():
+    prop = property_parser.Property('This is a fake line')
+    prop[property_parser.PropertyData.DISTRICT] = 'SYDNEY'
+    prop[property_parser.PropertyData.AREA] = ''
+
+    field_tuple = prop.get_field_tuple()
+    assert len(field_tuple) == len(property_parser.PropertyData)
+    assert field_tuple.count(None) == len(property_parser.PropertyData) - 2
+    assert (property_parser.field_tuple_to_dic(field_tuple) ==
+            prop.get_field_dic())
+
+
+def test_property_is_slotted():
+    prop = property_parser.Property('This is a fake line')
+    with pytest.raises(AttributeError):
+        prop.new_attribute = 'value'
+
+
 def test_property_parse():
     prop = property_parser.Property('This is a fake line')
     with pytest.raises(NotImplementedError):
         prop.parse()
 
 
+def test_compile_layout():
+    extract = property_parser.compile_layout([
+        property_parser.FieldSpec(2, property_parser.PropertyData.ZONE_CODE),
+        property_parser.FieldSpec(2, property_parser.PropertyData.ZONE, str.lower),
+        property_parser.FieldSpec(0, property_parser.PropertyData.PROPERTY_ID)
+    ])
+    prop = property_parser.Property('')
+    prop._values = extract(['  123 ', 'ignored', ' RES '])
+
+    assert prop.get_field_dic() == {'Property_ID': '123', 'Zone_Code': 'RES', 'Zone': 'res'}
+
+
+def test_compile_layout_field_mapped_twice():
+    with pytest.raises(ValueError):
+        property_parser.compile_layout([
+            property_parser.FieldSpec(0, property_parser.PropertyData.ZONE),
+            property_parser.FieldSpec(1, property_parser.PropertyData.ZONE)
+        ])
+
+
 ################################
 # Tests for Class PropertyFile
 ################################
@@ -61,6 +120,106 @@ def test_property_file_line_of_interest():
         prop.line_of_interest('This is a fake line')
 
 
+def test_property_file_create_property_from_raw_line():
+    prop = property_parser.PropertyFile(R'file/path')
+    with pytest.raises(NotImplementedError):
+        prop.create_property_from_raw_line(b'This is a fake line')
+
+
+def test_property_file_iter_column_batches():
+    prop = property_parser.PropertyFile(R'file/path')
+    with pytest.raises(NotImplementedError):
+        next(prop.iter_column_batches(10))
+
+
+################################
+# Tests for Class ColumnBatch
+################################
+def test_column_batch():
+    values = [None] * len(property_parser.PropertyData)
+    area_slot = list(property_parser.PropertyData).index(property_parser.PropertyData.AREA)
+    rows = [list(values), list(values)]
+    rows[0][area_slot] = '802.3'
+    rows[1][area_slot] = ''
+
+    batch = property_parser.ColumnBatch(rows, 'file.DAT', array.array('q', [5, 7]))
+
+    assert len(batch) == 2
+    area = batch.numeric_column(property_parser.PropertyData.AREA)
+    assert area[0] == 802.3
+    assert math.isnan(area[1])
+    assert batch.to_dict_list() == [
+        {'File_Name': 'file.DAT', 'Line_No': '5', 'Area': '802.3'},
+        {'File_Name': 'file.DAT', 'Line_No': '7', 'Area': ''}]
+
+
+COLUMN_BATCH_NUMBERS = [
+    ('12.50', 12.5),
+    ('0515000', 515000.0),
+    ('1e6', 1000000.0),
+    ('N/A', math.nan),
+]
+@pytest.mark.parametrize('value, expected_number', COLUMN_BATCH_NUMBERS)
+def test_column_batch_keeps_source_strings(value, expected_number):
+    values = [None] * len(property_parser.PropertyData)
+    price_slot = list(property_parser.PropertyData).index(property_parser.PropertyData.PURCHASE_PRICE)
+    values[price_slot] = value
+
+    batch = property_parser.ColumnBatch([values], 'file.DAT', array.array('q', [5]))
+
+    price = batch.numeric_column(property_parser.PropertyData.PURCHASE_PRICE)[0]
+    assert price == expected_number or (math.isnan(price) and math.isnan(expected_number))
+    assert batch.text_column(property_parser.PropertyData.PURCHASE_PRICE) == [value]
+    assert batch.to_dict_list() == [
+        {'File_Name': 'file.DAT', 'Line_No': '5', 'Purchase_Price': value}]
+
+
+def test_column_batch_empty():
+    batch = property_parser.ColumnBatch([], 'file.DAT', array.array('q'))
+
+    assert len(batch) == 0
+    assert batch.to_dict_list() == []
+
+
+def test_property_file_create_lazy_property_from_raw_line():
+    prop = property_parser.PropertyFile(R'file/path')
+    with pytest.raises(NotImplementedError):
+        prop.create_lazy_property_from_raw_line(b'This is a fake line')
+
+
+def test_property_file_iter_records_lazy_text():
+    prop = property_parser.PropertyFile(R'file/path')
+    with pytest.raises(ValueError, match='BINARY_PARSE'):
+        prop.iter_records(lazy=True)
+
+
+def test_lazy_property_from_raw_line():
+    with pytest.raises(NotImplementedError):
+        property_parser.LazyProperty.from_raw_line(b'This is a fake line')
+
+
+def test_property_file_raw_line_of_interest():
+    prop = property_parser.PropertyFile(R'file/path')
+    with pytest.raises(NotImplementedError):
+        prop.raw_line_of_interest(b'This is a fake line')
+
+
+def test_property_from_raw_line():
+    with pytest.raises(NotImplementedError):
+        property_parser.Property.from_raw_line(b'This is a fake line')
+
+
+DECODE_FIELD = [
+    ('', b''),
+    ('WESTON', b' WESTON \r\n'),
+    ('CAF\xc9', 'CAF\xc9'.encode('utf8')),
+    ('CAF\xc9', 'CAF\xc9'.encode('latin-1'))
+]
+@pytest.mark.parametrize('expected_field, raw_field', DECODE_FIELD)
+def test_decode_field(expected_field, raw_field):
+    assert expected_field == property_parser.decode_field(raw_field)
+
+
 # TODO Need some stubs to test this paring
 #def test_property_file_parse():
 
@@ -86,6 +245,73 @@ DATE_CONVERSION = [
 def test_convert_time_to_internal(expected_date, date, date_format):
     assert expected_date == property_parser.convert_date_to_internal(date, date_format)
 
+DATE_CONVERSION_SLICED = [
+    ('20171121', '%Y%M%d'),
+    ('19900101', '%Y%M%d'),
+    ('20180131', '%Y%M%d'),
+    ('20/11/1990', '%d/%M/%Y'),
+    ('1/2/1990', '%d/%M/%Y'),
+    ('31/12/2001', '%d/%M/%Y')
+]
+@pytest.mark.parametrize('date, date_format', DATE_CONVERSION_SLICED)
+def test_convert_date_to_internal_matches_strptime(date, date_format):
+    expected_date = datetime.datetime.strptime(date, date_format).strftime('%Y/%M/%d')
+    assert expected_date == property_parser.convert_date_to_internal(date, date_format)
+
+
+DATE_CONVERSION_INVALID = [
+    ('20171200', '%Y%M%d'),
+    ('20171132', '%Y%M%d'),
+    ('00/11/1990', '%d/%M/%Y'),
+    ('20/11/90', '%d/%M/%Y'),
+    ('20-11-1990', '%d/%M/%Y')
+]
+@pytest.mark.parametrize('date, date_format', DATE_CONVERSION_INVALID)
+def test_convert_date_to_internal_invalid(date, date_format):
+    with pytest.raises(ValueError):
+        property_parser.convert_date_to_internal(date, date_format)
+
+
+def test_convert_date_to_internal_cache():
+    property_parser.convert_date_to_internal.cache_clear()
+
+    property_parser.convert_date_to_internal('20171121', '%Y%M%d')
+    property_parser.convert_date_to_internal('20171121', '%Y%M%d')
+    property_parser.convert_date_to_internal('20171122', '%Y%M%d')
+
+    info = property_parser.convert_date_to_internal.cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert 'Hits: 1, Misses: 2' in property_parser.date_cache_info()
+
+
+def test_string_pool():
+    pool = property_parser.StringPool(2)
+    first = ''.join(['WES', 'TON'])
+    second = ''.join(['WES', 'TON'])
+
+    assert pool.intern(first, first) is first
+    assert pool.intern(second, second) is first
+    assert len(pool) == 1
+
+    pool.intern('A', 'A')
+    pool.intern('B', 'B')
+    pool.trim()
+    assert len(pool) == 0
+
+
+LINE_NO_TO_STR = [
+    ('0', 0),
+    ('17', 17),
+    ('65535', 65535),
+    ('65536', 65536),
+    ('1234567', 1234567)
+]
+@pytest.mark.parametrize('expected_str, line_no', LINE_NO_TO_STR)
+def test_line_no_to_str(expected_str, line_no):
+    assert expected_str == property_parser.line_no_to_str(line_no)
+
+
 SPLIT_STR = [
     (['Test'], 'Test', ','),
     (['Test, List'], 'Test, List', ';'),
@@ -94,3 +320,54 @@ SPLIT_STR = [
 @pytest.mark.parametrize('expected_list, text, separator', SPLIT_STR)
 def test_split_str(expected_list, text, separator):
     assert expected_list == property_parser.split_str(text, separator)
+
+
+SQL_CONVERTERS = [
+    (51500000, property_parser.price_to_cents, '515000'),
+    (12345, property_parser.price_to_cents, '123.45'),
+    (None, property_parser.price_to_cents, 'N/A'),
+    (None, property_parser.price_to_cents, 'Infinity'),
+    (None, property_parser.price_to_cents, 'NaN'),
+    (None, property_parser.price_to_cents, 'sNaN'),
+    (None, property_parser.price_to_cents, '1e30'),
+    (None, property_parser.price_to_cents, '1e999999'),
+    (None, property_parser.price_to_cents, '92233720368547758.08'),
+    (9223372036854775807, property_parser.price_to_cents,
+     '92233720368547758.07'),
+    (20171121, property_parser.date_to_int, '2017/11/21'),
+    (None, property_parser.date_to_int, 'N/A'),
+    (None, property_parser.date_to_int, '2017/1/21'),
+    (802.3, property_parser.to_real, '802.3'),
+    (None, property_parser.to_real, 'ABC'),
+    (2326, property_parser.to_int, '2326'),
+    (None, property_parser.to_int, '23A6'),
+    (None, property_parser.to_int, '9223372036854775808'),
+    (-9223372036854775808, property_parser.to_int, '-9223372036854775808'),
+    (None, property_parser.to_real, 'inf'),
+    (None, property_parser.to_real, 'nan'),
+]
+@pytest.mark.parametrize('expected_value, converter, value', SQL_CONVERTERS)
+def test_sql_converters(expected_value, converter, value):
+    assert converter(value) == expected_value
+
+
+def test_row_converter():
+    prop = property_parser.Property('')
+    prop[property_parser.PropertyData.PURCHASE_PRICE] = '515000'
+    prop[property_parser.PropertyData.CONTRACT_DATE] = '2017/11/21'
+    prop[property_parser.PropertyData.SETTLEMENT_DATE] = ''
+    prop[property_parser.PropertyData.POST_CODE] = '2326'
+    values = prop.get_field_tuple()
+
+    convert = property_parser.compile_row_converter([
+        property_parser.PropertyData.PURCHASE_PRICE,
+        property_parser.PropertyData.CONTRACT_DATE,
+        property_parser.PropertyData.SETTLEMENT_DATE,
+        property_parser.PropertyData.AREA])
+    row = dict(zip(property_parser.PropertyData, convert(values)))
+
+    assert row[property_parser.PropertyData.PURCHASE_PRICE] == 51500000
+    assert row[property_parser.PropertyData.CONTRACT_DATE] == 20171121
+    assert row[property_parser.PropertyData.SETTLEMENT_DATE] is None
+    assert row[property_parser.PropertyData.AREA] is None
+    assert row[property_parser.PropertyData.POST_CODE] == '2326'
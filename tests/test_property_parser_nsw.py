@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import io
+
 import pytest
 
 import property_parser
@@ -20,6 +22,12 @@ def test_nsw_old_property_init():
 # TODO Need some stubs to test this paring
 #def test_nsw_old_property_parse():
 
+OLD_FILE_CONTENT = '''A;;VALNET1;20150909 11:33;;
+B;011;VALNET1;0145900000000;292674;;;ELDON ST;ABERDEEN;2336;20/11/1990;14500;LOT 7 SEC 22 DP 758003, LOT 8 SEC 22 DP 758003.;2365;M;;;A;;;;
+B;011;VALNET1;0145900000001;292675;;12;MAIN ST;ABERDEEN;2336;;250000;LOT 1 DP 1;700;M;;;;;;;
+Z;2;2;;
+'''
+
 
 ####################################
 # Tests for Class NswOldPropertyFile
@@ -78,6 +86,170 @@ def test_nsw_old_property_file_line_of_interest(line):
     assert not prop.line_of_interest(line)
 
 
+@pytest.mark.parametrize('line', OLD_FILE_LINE_OF_INTEREST)
+def test_nsw_old_property_file_raw_line_of_interest(line):
+    prop = property_parser_nsw.NswOldPropertyFile(R'file/path')
+    assert prop.raw_line_of_interest(line.encode())
+
+
+@pytest.mark.parametrize('line', OLD_FILE_LINE_NOT_OF_INTEREST)
+def test_nsw_old_property_file_raw_line_not_of_interest(line):
+    prop = property_parser_nsw.NswOldPropertyFile(R'file/path')
+    assert not prop.raw_line_of_interest(line.encode())
+
+
+def test_nsw_old_property_file_iter_records(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    records = list(prop_file.iter_records())
+
+    assert len(records) == 2
+    assert prop_file._properties == []
+    assert records[0][property_parser.PropertyData.FILE_NAME] == 'ARCHIVE_SALES_1990.DAT'
+    assert records[0][property_parser.PropertyData.LINE_NO] == '2'
+    assert records[0][property_parser.PropertyData.DISTRICT] == 'UPPER HUNTER (Former)'
+    assert records[0][property_parser.PropertyData.CONTRACT_DATE] == '1990/11/20'
+    assert records[1][property_parser.PropertyData.LINE_NO] == '3'
+    assert records[1][property_parser.PropertyData.CONTRACT_DATE] == 'N/A'
+
+
+def test_nsw_old_property_file_iter_records_latin1(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_bytes(OLD_FILE_CONTENT.replace('ELDON ST', 'CAF\xc9 ST').encode('latin-1'))
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    records = list(prop_file.iter_records())
+
+    assert len(records) == 2
+    assert records[0][property_parser.PropertyData.STREET_NAME] == 'CAF\xc9 ST'
+
+
+def test_nsw_old_property_file_iter_records_short_line(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text('B;011;VALNET1;\n')
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    with pytest.raises(ValueError):
+        list(prop_file.iter_records())
+
+
+def test_nsw_old_property_file_iter_records_mmap(tmp_path, monkeypatch):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+    expected = [prop.get_field_dic() for prop in prop_file.iter_records()]
+
+    monkeypatch.setattr(property_parser_nsw.NswOldPropertyFile, 'MMAP_THRESHOLD_BYTES', 0)
+    records = [prop.get_field_dic() for prop in prop_file.iter_records()]
+
+    assert records == expected
+
+
+def test_nsw_old_property_file_line_index(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    prop_file.build_line_index()
+
+    assert prop_file._properties == []
+    assert len(prop_file) == 2
+    assert prop_file[1][property_parser.PropertyData.PROPERTY_ID] == '292675'
+    assert prop_file[1][property_parser.PropertyData.LINE_NO] == '3'
+    assert [prop[property_parser.PropertyData.PROPERTY_ID] for prop in prop_file] == ['292674', '292675']
+    with pytest.raises(IndexError):
+        prop_file[2]
+
+
+def test_nsw_old_property_file_line_index_empty_file(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text('')
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    prop_file.build_line_index()
+
+    assert len(prop_file) == 0
+
+
+ITER_BATCHES = [
+    (1, [1, 1]),
+    (2, [2]),
+    (5, [2])
+]
+@pytest.mark.parametrize('batch_size, expected_sizes', ITER_BATCHES)
+def test_nsw_old_property_file_iter_column_batches(tmp_path, batch_size, expected_sizes):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    batches = list(prop_file.iter_column_batches(batch_size))
+
+    assert [len(batch) for batch in batches] == expected_sizes
+    assert [dic for batch in batches for dic in batch.to_dict_list()] == \
+        [prop.get_field_dic() for prop in prop_file.iter_records()]
+
+
+def test_nsw_old_property_file_column_batch_columns(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    batch = next(prop_file.iter_column_batches(10))
+
+    assert list(batch.line_numbers) == [2, 3]
+    assert list(batch.numeric_column(property_parser.PropertyData.PURCHASE_PRICE)) == [14500.0, 250000.0]
+    assert batch.text_column(property_parser.PropertyData.SUBBURB) == ['ABERDEEN', 'ABERDEEN']
+    assert batch.text_column(property_parser.PropertyData.FILE_NAME) == ['ARCHIVE_SALES_1990.DAT'] * 2
+    assert batch.text_column(property_parser.PropertyData.SETTLEMENT_DATE) == [None, None]
+
+
+def test_nsw_old_property_file_iter_records_shares_strings(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    first, second = prop_file.iter_records()
+
+    for field in [property_parser.PropertyData.SUBBURB,
+                  property_parser.PropertyData.POST_CODE,
+                  property_parser.PropertyData.FILE_NAME]:
+        assert first[field] is second[field]
+
+
+def test_nsw_old_property_file_iter_records_lazy(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    records = list(prop_file.iter_records(lazy=True))
+
+    assert all(isinstance(record, property_parser_nsw.NswOldLazyProperty) for record in records)
+    assert [record.get_field_dic() for record in records] == \
+        [record.get_field_dic() for record in prop_file.iter_records()]
+
+
+def test_nsw_old_property_file_iter_records_lazy_short_line(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text('B;011;VALNET1;\n')
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    with pytest.raises(ValueError):
+        list(prop_file.iter_records(lazy=True))
+
+
+def test_nsw_old_property_file_parse(tmp_path):
+    file_path = tmp_path / 'ARCHIVE_SALES_1990.DAT'
+    file_path.write_text(OLD_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswOldPropertyFile(str(file_path))
+
+    prop_file.parse()
+
+    assert len(prop_file) == 2
+    assert [prop['Property_ID'] for prop in prop_file.get_lines_as_list()] == ['292674', '292675']
+
+
 ################################
 # Tests for Class NswNewProperty
 ################################
@@ -92,6 +264,13 @@ def test_nsw_new_property_init():
 # TODO Need some stubs to test this paring
 #def test_nsw_new_property_parse():
 
+NEW_FILE_CONTENT = '''A;RTSALEDATA;001;20180115 01:15;VALNET;
+B;001;3771736;141;20180115 01:15;;;73 A;KLINE ST;WESTON;2326;802.3;M;20171121;20171219;515000;R2;R;RESIDENCE;;AAN;;0;AN8513;
+C;001;3968570;148;20180115 01:15;928/1209451;
+D;001;3968570;148;20180115 01:15;P;;;;;;
+Z;732;148;148;434;
+'''
+
 ####################################
 # Tests for Class NswNewPropertyFile
 ####################################
@@ -105,6 +284,43 @@ def test_nsw_new_property_file_init():
     assert prop._idx == 0
 
 
+def test_nsw_new_property_file_iter_records_from_stream():
+    prop_file = property_parser_nsw.NswNewPropertyFile(
+        R'archive.zip/001_SALES_DATA_NNME_15012018.DAT',
+        lambda: io.BytesIO(NEW_FILE_CONTENT.encode()))
+
+    records = list(prop_file.iter_records())
+
+    assert len(records) == 1
+    assert records[0][property_parser.PropertyData.FILE_NAME] == '001_SALES_DATA_NNME_15012018.DAT'
+    assert records[0][property_parser.PropertyData.DISTRICT] == 'CESSNOCK'
+    with pytest.raises(ValueError, match='cannot be indexed'):
+        prop_file.build_line_index()
+
+
+def test_nsw_new_property_file_iter_records(tmp_path):
+    file_path = tmp_path / '001_SALES_DATA_NNME_15012018.DAT'
+    file_path.write_text(NEW_FILE_CONTENT)
+    prop_file = property_parser_nsw.NswNewPropertyFile(str(file_path))
+
+    records = list(prop_file.iter_records())
+
+    assert len(records) == 1
+    record = records[0]
+    assert record[property_parser.PropertyData.LINE_NO] == '2'
+    assert record[property_parser.PropertyData.DISTRICT] == 'CESSNOCK'
+    assert record[property_parser.PropertyData.PROPERTY_ID] == '3771736'
+    assert record[property_parser.PropertyData.HOUSE_NUMBER] == '73 A'
+    assert record[property_parser.PropertyData.AREA] == '802.3'
+    assert record[property_parser.PropertyData.CONTRACT_DATE] == '2017/11/21'
+    assert record[property_parser.PropertyData.SETTLEMENT_DATE] == '2017/12/19'
+    assert record[property_parser.PropertyData.PURCHASE_PRICE] == '515000'
+    assert record[property_parser.PropertyData.ZONE] == 'Low Density Residential'
+    assert record[property_parser.PropertyData.ZONE_TYPE] == 'Residential'
+    assert record[property_parser.PropertyData.NATURE_OF_PROPERTY] == 'R'
+    assert record[property_parser.PropertyData.PRIMARY_PURPOSE] == 'RESIDENCE'
+
+
 NEW_FILE_NAMES_ALLOWED = [
     ('001_SALES_DATA_NNME_15012018.DAT')
 ]
@@ -147,3 +363,50 @@ NEW_FILE_LINE_NOT_OF_INTEREST = [
 def test_nsw_new_property_file_line_of_interest(line):
     prop = property_parser_nsw.NswNewPropertyFile(R'file/path')
     assert not prop.line_of_interest(line)
+
+
+@pytest.mark.parametrize('line', NEW_FILE_LINE_OF_INTEREST)
+def test_nsw_new_property_file_raw_line_of_interest(line):
+    prop = property_parser_nsw.NswNewPropertyFile(R'file/path')
+    assert prop.raw_line_of_interest(line.encode())
+
+
+@pytest.mark.parametrize('line', NEW_FILE_LINE_NOT_OF_INTEREST)
+def test_nsw_new_property_file_raw_line_not_of_interest(line):
+    prop = property_parser_nsw.NswNewPropertyFile(R'file/path')
+    assert not prop.raw_line_of_interest(line.encode())
+
+
+@pytest.mark.parametrize('line', NEW_FILE_LINE_OF_INTEREST)
+def test_nsw_new_property_from_raw_line_matches_parse(line):
+    prop = property_parser_nsw.NswNewProperty(line)
+    prop.parse()
+
+    raw_prop = property_parser_nsw.NswNewProperty.from_raw_line(line.encode())
+
+    assert raw_prop.get_field_dic() == prop.get_field_dic()
+
+
+@pytest.mark.parametrize('line', NEW_FILE_LINE_OF_INTEREST)
+def test_nsw_new_lazy_property_converts_on_access(line):
+    prop = property_parser_nsw.NswNewLazyProperty.from_raw_line(line.encode())
+
+    assert prop._raw_fields is None
+    assert prop[property_parser.PropertyData.PROPERTY_ID] == '3771736'
+    assert prop._values[list(property_parser.PropertyData).index(property_parser.PropertyData.CONTRACT_DATE)] is None
+
+    prop[property_parser.PropertyData.ZONE] = 'Overridden'
+    assert prop[property_parser.PropertyData.ZONE] == 'Overridden'
+
+    expected = property_parser_nsw.NswNewProperty(line)
+    expected.parse()
+    expected[property_parser.PropertyData.ZONE] = 'Overridden'
+    assert prop.get_field_dic() == expected.get_field_dic()
+
+
+@pytest.mark.parametrize('line', NEW_FILE_LINE_OF_INTEREST)
+def test_nsw_new_lazy_property_field_tuple(line):
+    prop = property_parser_nsw.NswNewLazyProperty.from_raw_line(line.encode())
+
+    expected = property_parser_nsw.NswNewProperty.from_raw_line(line.encode())
+    assert prop.get_field_tuple() == expected.get_field_tuple()